@@ -0,0 +1,192 @@
+import os
+import re
+import shutil
+import collections
+
+import metrics
+
+PAGE_LINES = 200
+INDEX_EVERY = 1024
+SPILL_CHUNK = 64 * 1024
+
+_HINT_RE = re.compile(r"\.\.\. (\d+) earlier lines kept on disk \(reopen \d+ ")
+
+
+class CapturedOutput:
+    """One command's output, stored as a byte range of the session file."""
+
+    def __init__(self, number, command, out_type, start):
+        self.number = number
+        self.command = command
+        self.out_type = out_type
+        self.start = start
+        self.end = start
+        self.line_count = 0
+        # Byte offset of every INDEX_EVERY-th line, so paging only has to
+        # skip a bounded number of lines after a seek.
+        self.index = [start]
+
+
+class OutputCapture:
+    """
+    Captures every command's output to a per-session file on disk and only
+    keeps a bounded tail of each result in memory for the screen.
+    """
+
+    def __init__(self, directory=None, memory_budget=1024 * 1024):
+        if directory is None:
+            import tempfile
+            directory = tempfile.mkdtemp(prefix="winux-")
+        self.directory = directory
+        self.path = os.path.join(self.directory, "session.out")
+        self.memory_budget = memory_budget
+        self.entries = []
+        # Unbuffered, so every write in _spill is one we can account for.
+        self._file = open(self.path, "ab+", buffering=0)
+
+    def record(self, command, out_type, text):
+        """
+        Write text (a string or an iterable of lines) to the session file.
+        Returns (entry, lines) where lines are the (type, text) pairs that
+        should go on screen.
+        """
+        if isinstance(text, str):
+            text = text.split("\n")
+        entry = self.start(command, out_type)
+        tail = collections.deque()
+        tail_bytes = 0
+        dropped = 0
+        for line, size in self._write(entry, text):
+            tail.append(line)
+            tail_bytes += size
+            while tail_bytes > self.memory_budget and len(tail) > 1:
+                tail_bytes -= len(tail.popleft().encode("utf-8", "replace")) + 1
+                dropped += 1
+        lines = [(out_type, line) for line in tail]
+        if dropped:
+            lines.insert(0, ("warning", f"... {dropped} earlier lines kept on disk "
+                                        f"(reopen {entry.number} to page, save-output {entry.number} <file> to save)"))
+        return entry, lines
+
+    def start(self, command, out_type):
+        """
+        Begin a new entry whose lines are added with append() as they are
+        produced, for output that is streamed to the screen.
+        """
+        self._file.seek(0, os.SEEK_END)
+        entry = CapturedOutput(len(self.entries) + 1, command, out_type, self._file.tell())
+        self.entries.append(entry)
+        return entry
+
+    def append(self, entry, lines):
+        """Write more lines of entry, which must be the newest entry."""
+        for _ in self._write(entry, lines):
+            pass
+
+    def _write(self, entry, lines):
+        """Writes lines to the end of entry, yielding (line, encoded size) for each."""
+        pending = []
+        pending_bytes = 0
+        try:
+            for line in lines:
+                line = line.rstrip("\r\n")
+                data = line.encode("utf-8", "replace") + b"\n"
+                pending.append(data)
+                pending_bytes += len(data)
+                if pending_bytes >= SPILL_CHUNK:
+                    self._spill(pending)
+                    pending = []
+                    pending_bytes = 0
+                entry.end += len(data)
+                entry.line_count += 1
+                if entry.line_count % INDEX_EVERY == 0:
+                    entry.index.append(entry.end)
+                yield line, len(data)
+        finally:
+            self._spill(pending)
+
+    def _spill(self, chunks):
+        data = memoryview(b"".join(chunks))
+        while data:
+            n = self._file.write(data)
+            data = data[n:]
+            metrics.exclude_io(written=n)
+
+    def get(self, number):
+        if 1 <= number <= len(self.entries):
+            return self.entries[number - 1]
+        return None
+
+    def read_lines(self, entry, first, count):
+        """Read count lines starting at line index first, without loading the rest."""
+        first = max(0, first)
+        block = min(first // INDEX_EVERY, len(entry.index) - 1)
+        lines = []
+        with open(self.path, "rb") as f:
+            f.seek(entry.index[block])
+            lineno = block * INDEX_EVERY
+            while lineno < first and f.tell() < entry.end:
+                f.readline()
+                lineno += 1
+            while len(lines) < count and f.tell() < entry.end:
+                lines.append(f.readline().decode("utf-8", "replace").rstrip("\n"))
+        return lines
+
+    def save(self, entry, dest):
+        with open(self.path, "rb") as src, open(dest, "wb") as out:
+            src.seek(entry.start)
+            remaining = entry.end - entry.start
+            while remaining > 0:
+                chunk = src.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def saved_line(text):
+    """
+    text as it should be written to the session file. The capture file is
+    deleted at exit and entry numbers start over, so a restored "reopen N"
+    hint would page through some other command's output.
+    """
+    m = _HINT_RE.match(text)
+    return f"... {m.group(1)} earlier lines were not saved" if m else text
+
+
+def lines_over_budget(history, budget, limit=None):
+    """
+    Number of lines at the start of history (a list of (type, text)) to drop
+    so the rest fits in budget bytes, at most limit. Only walks the lines
+    that fit, so the cost is bounded by the budget, not the scrollback.
+    """
+    used = 0
+    for i in range(len(history) - 1, -1, -1):
+        used += len(history[i][1]) + 1
+        if used > budget:
+            cut = i + 1
+            return cut if limit is None else min(cut, limit)
+    return 0
+
+
+_session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = OutputCapture()
+    return _session
+
+
+def close_session():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
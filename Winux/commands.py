@@ -2,31 +2,282 @@ import os
 import shutil
 import platform
 import fnmatch
-import subprocess
+import functools
+import stat
 import sys
 import getpass
 import datetime
-import socket
-import tarfile
-import zipfile
 import collections
-
-try:
-    import psutil
-except ImportError:
-    psutil = None
+import re
+import time
+import capture
+import metrics
+import frecency
+import proctable
 
 COMMAND_HISTORY = []
 
+# Width in character cells that column layouts (ls) should fit; None means
+# ask the real terminal.
+TERMINAL_COLUMNS = None
+
+
+def set_terminal_columns(columns):
+    """Called by the UI whenever the number of visible columns changes."""
+    global TERMINAL_COLUMNS
+    TERMINAL_COLUMNS = columns
+
+
+def _terminal_columns():
+    return TERMINAL_COLUMNS or shutil.get_terminal_size().columns
+
+
+def _read_lines(f):
+    with f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def _find_lines(cwd, pattern):
+    found = False
+    for root, dirs, files in os.walk(cwd):
+        for name in files + dirs:
+            if fnmatch.fnmatch(name, pattern):
+                found = True
+                yield os.path.relpath(os.path.join(root, name), cwd)
+    if not found:
+        yield "No matches found."
+
+
+def _parse_options(args, spec):
+    """
+    Split args into ({flag: value}, positionals) for flags that take one
+    value, converting each value with the type given in spec.
+    """
+    opts = {}
+    rest = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in spec:
+            if i + 1 >= len(args):
+                raise ValueError(f"Option {arg} requires a value.")
+            try:
+                opts[arg] = spec[arg](args[i + 1])
+            except ValueError:
+                raise ValueError(f"Invalid value for {arg}: {args[i + 1]}")
+            i += 2
+        else:
+            rest.append(arg)
+            i += 1
+    return opts, rest
+
+
+PS_SORT_KEYS = {"pid": "pid", "name": "name", "user": "username", "rss": "rss", "mem": "rss"}
+
+LS_FLAGS = "lahStrRU1"
+
+
+def _human_size(size):
+    for unit in ("", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size}" if not unit else f"{size:.0f}{unit}" if size >= 10 else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_mtime(minute):
+    # Entries in one directory tend to share timestamps, so format each minute once.
+    return datetime.datetime.fromtimestamp(minute * 60).strftime("%b %d %H:%M")
+
+
+def _ls_long(entry, st, flags):
+    size = _human_size(st.st_size) if "h" in flags else str(st.st_size)
+    mtime = _format_mtime(int(st.st_mtime) // 60)
+    name = entry.name
+    if entry.is_symlink():
+        try:
+            name = f"{name} -> {os.readlink(entry.path)}"
+        except OSError:
+            pass
+    return f"{stat.filemode(st.st_mode)} {size:>8} {mtime} {name}"
+
+
+def _ls_columns(names, width):
+    if not names:
+        return []
+    col_width = max(len(n) for n in names) + 2
+    ncols = max(1, width // col_width)
+    nrows = -(-len(names) // ncols)
+    lines = []
+    for r in range(nrows):
+        row = names[r::nrows]
+        lines.append("".join(n.ljust(col_width) for n in row).rstrip())
+    return lines
+
+
+def _ls_lines(path, shown, flags, width):
+    """
+    Yields ls output for path. One os.scandir pass per directory provides the
+    names and file types, and stat is only requested when -l, -S or -t need it.
+    With -U (unsorted, one per line) entries are yielded as they are read.
+    """
+    if not os.path.isdir(path):
+        if "l" in flags:
+            st = os.lstat(path)
+            size = _human_size(st.st_size) if "h" in flags else str(st.st_size)
+            mtime = _format_mtime(int(st.st_mtime) // 60)
+            yield f"{stat.filemode(st.st_mode)} {size:>8} {mtime} {shown}"
+        else:
+            yield shown
+        return
+
+    show_all = "a" in flags
+    recursive = "R" in flags
+    long_format = "l" in flags
+    streaming = "U" in flags
+    one_per_line = long_format or streaming or "1" in flags
+
+    pending = [(path, shown)]
+    first = True
+    while pending:
+        dir_path, dir_shown = pending.pop()
+        if recursive:
+            if not first:
+                yield ""
+            yield f"{dir_shown}:"
+        first = False
+        try:
+            it = os.scandir(dir_path)
+        except OSError as e:
+            yield f"ls: cannot open directory '{dir_shown}': {e.strerror}"
+            continue
+
+        subdirs = []
+        with it:
+            entries = (e for e in it if show_all or not e.name.startswith("."))
+            if not streaming:
+                entries = list(entries)
+                if "S" in flags:
+                    entries.sort(key=lambda e: _entry_stat(e).st_size, reverse=True)
+                elif "t" in flags:
+                    entries.sort(key=lambda e: _entry_stat(e).st_mtime, reverse=True)
+                else:
+                    entries.sort(key=lambda e: e.name.lower())
+                if "r" in flags:
+                    entries.reverse()
+
+            names = []
+            for entry in entries:
+                if recursive and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry)
+                if long_format:
+                    yield _ls_long(entry, _entry_stat(entry), flags)
+                elif one_per_line:
+                    yield entry.name
+                else:
+                    names.append(entry.name)
+            if not one_per_line:
+                yield from _ls_columns(names, width)
+
+        for entry in reversed(subdirs):
+            pending.append((entry.path, os.path.join(dir_shown, entry.name)))
+
+
+def _ls_many(targets, flags, width):
+    """
+    ls of several (path, shown) targets: missing ones are reported first,
+    then plain files, then each directory under a 'name:' header.
+    """
+    first = True
+    for path, shown in targets:
+        if not os.path.lexists(path):
+            yield f"ls: cannot access '{shown}': No such file or directory"
+            first = False
+    for path, shown in targets:
+        if os.path.lexists(path) and not os.path.isdir(path):
+            yield from _ls_lines(path, shown, flags, width)
+            first = False
+    for path, shown in targets:
+        if os.path.isdir(path):
+            if not first:
+                yield ""
+            first = False
+            if "R" not in flags:
+                # -R already starts every directory with its own header.
+                yield f"{shown}:"
+            yield from _ls_lines(path, shown, flags, width)
+
+
+def _entry_stat(entry):
+    try:
+        return entry.stat(follow_symlinks=False)
+    except OSError:
+        return os.stat_result((0,) * 10)
+
+
+def _grep_lines(cwd, pattern, files):
+    found = False
+    for filename in files:
+        file_path = filename if os.path.isabs(filename) else os.path.join(cwd, filename)
+        if not os.path.isfile(file_path):
+            found = True
+            yield f"File not found: {filename}"
+            continue
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    if pattern in line:
+                        found = True
+                        yield f"{filename}:{lineno}:{line.rstrip()}"
+        except Exception as e:
+            found = True
+            yield f"Error reading {filename}: {str(e)}"
+    if not found:
+        yield "No matches found."
+
 
-def run_command(cwd, cmd):
+def run_command(cwd, cmd, record_history=True):
     """
     Handle Linux-style shell commands.
     Returns updated cwd and output tuple (type, text).
     """
+    parts = cmd.split(None, 1)
+    if not parts:
+        return _run_command(cwd, cmd, record_history)
+    name = parts[0].lower()
+    wall = time.time()
+    start = time.perf_counter()
+    io_before = metrics.io_counters()
+    cwd, output = _run_command(cwd, cmd, record_history)
+    if isinstance(output, tuple) and len(output) == 2 and not isinstance(output[1], str):
+        # Streamed output: measure until the consumer has drained it.
+        return cwd, (output[0], _measured(output[1], name, wall, start))
+    text = output[1] if isinstance(output, tuple) and len(output) == 2 else str(output)
+    lines = text.count("\n") + 1 if text else 0
+    metrics.METRICS.record_command(name, wall, time.perf_counter() - start,
+                                   io_before, metrics.io_counters(), lines)
+    return cwd, output
+
+
+def _measured(lines, name, wall, start):
+    # The work happens while the lines are consumed, possibly on another
+    # thread, so I/O is counted from there rather than from run_command.
+    io_before = metrics.io_counters()
+    count = 0
+    try:
+        for line in lines:
+            count += 1
+            yield line
+    finally:
+        metrics.METRICS.record_command(name, wall, time.perf_counter() - start,
+                                       io_before, metrics.io_counters(), count)
+
+
+def _run_command(cwd, cmd, record_history):
     stripped_cmd = cmd.strip()
 
-    if stripped_cmd and not stripped_cmd.startswith("history"):
+    if record_history and stripped_cmd and not stripped_cmd.startswith("history"):
         COMMAND_HISTORY.append(stripped_cmd)
 
     parts = stripped_cmd.split()
@@ -49,17 +300,53 @@ def run_command(cwd, cmd):
 
         if os.path.isdir(target):
             cwd = os.path.abspath(target)
+            if record_history:
+                frecency.get_index().visit(cwd)
             return cwd, ("normal", f"Changed directory to {cwd}")
         else:
             return cwd, ("error", f"No such directory: {target}")
 
     elif command == "ls":
-        try:
-            items = os.listdir(cwd)
-            
-            return cwd, ("dirlist", "\n".join(items))
-        except Exception as e:
-            return cwd, ("error", f"Error listing directory: {str(e)}")
+        flags = set()
+        paths = []
+        for arg in parts[1:]:
+            if arg.startswith("-") and len(arg) > 1:
+                unknown = set(arg[1:]) - set(LS_FLAGS)
+                if unknown:
+                    return cwd, ("error", f"ls: invalid option -- '{sorted(unknown)[0]}'\nUsage: ls [-{LS_FLAGS}] [path ...]")
+                flags.update(arg[1:])
+            else:
+                paths.append(arg)
+        targets = []
+        for target in paths or ["."]:
+            path = os.path.expanduser(target) if target.startswith("~") else target
+            if not os.path.isabs(path):
+                path = os.path.join(cwd, path)
+            targets.append((path, target))
+        if len(targets) > 1:
+            return cwd, ("dirlist", _ls_many(targets, flags, _terminal_columns()))
+        path, target = targets[0]
+        if not os.path.lexists(path):
+            return cwd, ("error", f"ls: cannot access '{target}': No such file or directory")
+        return cwd, ("dirlist", _ls_lines(path, target, flags, _terminal_columns()))
+
+    elif command in ("z", "j"):
+        index = frecency.get_index()
+        args = parts[1:]
+        if not args or args[0] == "-l":
+            ranked = index.matches(args[1:], limit=20)
+            if not ranked:
+                return cwd, ("normal", "No matching directories.")
+            return cwd, ("dirlist", "\n".join(f"{score:10.1f}  {path}" for score, path in ranked))
+        if args[0] == "-x":
+            index.remove(cwd)
+            return cwd, ("normal", f"Removed {cwd} from the directory index.")
+        best = index.best(args)
+        if best is None:
+            return cwd, ("error", f"No directory matching: {' '.join(args)}")
+        if record_history:
+            index.visit(best)
+        return best, ("normal", f"Changed directory to {best}")
 
     elif command == "mkdir":
         if len(parts) < 2:
@@ -98,9 +385,8 @@ def run_command(cwd, cmd):
         if not os.path.isfile(target):
             return cwd, ("error", f"No such file: {target}")
         try:
-            with open(target, "r", encoding="utf-8") as f:
-                content = f.read()
-            return cwd, ("normal", content)
+            f = open(target, "r", encoding="utf-8", errors="replace")
+            return cwd, ("normal", _read_lines(f))
         except Exception as e:
             return cwd, ("error", f"Error reading file: {str(e)}")
 
@@ -125,7 +411,9 @@ def run_command(cwd, cmd):
         help_text = (
             "Available commands:\n"
             "cd [dir] - change directory\n"
-            "ls - list directory contents\n"
+            "z|j <query...> - jump to the best-ranked visited directory matching query\n"
+            "z -l [query] - list ranked directories; z -x - forget the current directory\n"
+            "ls [-l -a -h -S -t -r -R -U -1] [path ...] - list directory contents\n"
             "mkdir - create directory\n"
             "pwd - print working directory\n"
             "rm - remove file or directory\n"
@@ -143,7 +431,9 @@ def run_command(cwd, cmd):
             "chmod - change permissions (simulated)\n"
             "chown - change owner (simulated)\n"
             "ln -s - create symbolic link\n"
-            "ps - list running processes\n"
+            "ps [-f] [-u user] [--sort [-]pid|name|user|rss] - list running processes\n"
+            "pgrep [-f] [-l] <pattern> - find process IDs by name\n"
+            "pkill [-f] [-9] <pattern> - terminate processes by name\n"
             "kill - terminate process by PID\n"
             "top - show simplified process list\n"
             "df - show disk usage summary\n"
@@ -152,16 +442,23 @@ def run_command(cwd, cmd):
             "tar -xf - extract tar archive\n"
             "zip - create zip archive\n"
             "unzip - extract zip archive\n"
-            "ping - ping host\n"
+            "ping [-c count] <host> [host...] - ping hosts concurrently, streaming replies\n"
+            "probe [-c count] [-p port] [-f hosts.txt] <host[:port]>... - TCP probe hosts concurrently\n"
             "wget - download file\n"
             "curl - download / transfer data\n"
             "hostname - show system hostname\n"
             "whoami - show current user\n"
             "date - show current date/time\n"
             "history - show command history\n"
+            "stats [reset] - show command latency, IO, frame time and cache statistics\n"
+            "stats --trace|--jsonl <file> - append events to a Chrome trace or JSONL file (off to stop)\n"
             "exit - exit shell\n"
             "env - show environment variables\n"
             "set - set environment variable\n"
+            "watch [-n secs] <command> - re-run a command and highlight changes\n"
+            "unwatch - stop the running watch (or press Esc)\n"
+            "reopen [n] [page] - list captured outputs or page through output n\n"
+            "save-output <n> <file> - save the full output of command n to a file\n"
             "theme [default|solarized|dracula] - change color theme\n"
             "Running script files by name with extension supported if present in directory."
         )
@@ -214,40 +511,12 @@ def run_command(cwd, cmd):
     elif command == "find":
         if len(parts) < 2:
             return cwd, ("error", "Usage: find <pattern>")
-        pattern = parts[1]
-        matches = []
-        for root, dirs, files in os.walk(cwd):
-            for name in files + dirs:
-                if fnmatch.fnmatch(name, pattern):
-                    full_path = os.path.relpath(os.path.join(root, name), cwd)
-                    matches.append(full_path)
-        if matches:
-            return cwd, ("normal", "\n".join(matches))
-        else:
-            return cwd, ("normal", "No matches found.")
+        return cwd, ("normal", _find_lines(cwd, parts[1]))
 
     elif command == "grep":
         if len(parts) < 3:
             return cwd, ("error", "Usage: grep <pattern> <files...>")
-        pattern = parts[1]
-        files = parts[2:]
-        matches = []
-        for filename in files:
-            file_path = filename if os.path.isabs(filename) else os.path.join(cwd, filename)
-            if not os.path.isfile(file_path):
-                matches.append(f"File not found: {filename}")
-                continue
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    for lineno, line in enumerate(f, 1):
-                        if pattern in line:
-                            matches.append(f"{filename}:{lineno}:{line.rstrip()}")
-            except Exception as e:
-                matches.append(f"Error reading {filename}: {str(e)}")
-        if matches:
-            return cwd, ("normal", "\n".join(matches))
-        else:
-            return cwd, ("normal", "No matches found.")
+        return cwd, ("normal", _grep_lines(cwd, parts[1], parts[2:]))
 
     elif command == "head":
         if len(parts) < 2:
@@ -321,23 +590,68 @@ def run_command(cwd, cmd):
             return cwd, ("error", f"Error creating symlink: {str(e)}")
 
     elif command == "ps":
-        if psutil is None:
+        usage = "Usage: ps [-f] [-u user] [--sort [-]pid|name|user|rss]"
+        args = [a for a in parts[1:] if a != "-f"]
+        full = len(args) != len(parts) - 1
+        try:
+            opts, rest = _parse_options(args, {"-u": str, "--sort": str})
+        except ValueError as e:
+            return cwd, ("error", f"{e}\n{usage}")
+        sort_key = opts.get("--sort", "pid")
+        descending = sort_key.startswith("-")
+        sort_attr = PS_SORT_KEYS.get(sort_key.lstrip("-"))
+        if rest or sort_attr is None:
+            return cwd, ("error", usage)
+        attrs = {"pid", "name", "username", "rss"}
+        if full:
+            attrs.add("cmdline")
+        try:
+            procs = proctable.get_table().snapshot(attrs)
+        except Exception as e:
+            return cwd, ("error", f"Error retrieving process list: {str(e)}")
+        if "-u" in opts:
+            procs = [p for p in procs if p["username"] == opts["-u"]]
+        procs = sorted(procs, key=lambda p: p[sort_attr], reverse=descending)
+        lines = [f"{'PID':>7} {'USER':<12} {'RSS':>8} {'CMD' if full else 'NAME'}"]
+        for p in procs:
+            cmd = (p["cmdline"] or f"[{p['name']}]") if full else p["name"]
+            lines.append(f"{p['pid']:>7} {p['username'][:12]:<12} {_human_size(p['rss']):>8} {cmd}")
+        return cwd, ("normal", "\n".join(lines))
+
+    elif command in ("pgrep", "pkill"):
+        flags = {a for a in parts[1:] if a.startswith("-")}
+        patterns = [a for a in parts[1:] if not a.startswith("-")]
+        allowed = {"-f", "-l"} if command == "pgrep" else {"-f", "-9"}
+        if len(patterns) != 1 or flags - allowed:
+            return cwd, ("error", f"Usage: {command} [{' '.join(sorted(allowed))}] <pattern>")
+        table = proctable.get_table()
+        try:
+            matches = table.find(patterns[0], full="-f" in flags)
+        except re.error as e:
+            return cwd, ("error", f"Invalid pattern: {e}")
+        except Exception as e:
+            return cwd, ("error", f"Error retrieving process list: {str(e)}")
+        if not matches:
+            return cwd, ("normal", "No matching processes.")
+        if command == "pgrep":
+            if "-l" in flags:
+                return cwd, ("normal", "\n".join(f"{p['pid']} {p['name']}" for p in matches))
+            return cwd, ("normal", "\n".join(str(p["pid"]) for p in matches))
+        lines = []
+        for p in matches:
             try:
-                proc = subprocess.run(["tasklist"], capture_output=True, text=True)
-                return cwd, ("normal", proc.stdout)
+                table.terminate(p["pid"], force="-9" in flags)
+                lines.append(f"Process {p['pid']} terminated.")
             except Exception as e:
-                return cwd, ("error", f"Error retrieving process list: {str(e)}")
-        else:
-            procs = []
-            for p in psutil.process_iter(['pid', 'name', 'username']):
-                procs.append(f"{p.info['pid']:>6} {p.info['name'][:25]:25} {p.info['username']}")
-            return cwd, ("normal", "\n".join(procs))
+                lines.append(f"Error killing process {p['pid']}: {str(e)}")
+        return cwd, ("normal", "\n".join(lines))
 
     elif command == "kill":
         if len(parts) < 2:
             return cwd, ("error", "Usage: kill <pid>")
         try:
             pid = int(parts[1])
+            psutil = proctable.load_psutil()
             if psutil:
                 p = psutil.Process(pid)
                 p.terminate()
@@ -349,6 +663,7 @@ def run_command(cwd, cmd):
             return cwd, ("error", f"Error killing process: {str(e)}")
 
     elif command == "top":
+        psutil = proctable.load_psutil()
         if psutil is None:
             return cwd, ("error", "psutil module not installed; top command unavailable.")
         procs = []
@@ -414,6 +729,7 @@ def run_command(cwd, cmd):
         if len(parts) < 3:
             return cwd, ("error", "Usage: tar -cf (create)\n"
                                    "or: tar -xf (extract)")
+        import tarfile
         option = parts[1]
         if option == "-cf":
             archive_name = parts[2]
@@ -442,6 +758,7 @@ def run_command(cwd, cmd):
     elif command == "zip":
         if len(parts) < 3:
             return cwd, ("error", "Usage: zip <archive.zip> <files...>")
+        import zipfile
         archive_name = parts[1]
         files = parts[2:]
         archive_path = archive_name if os.path.isabs(archive_name) else os.path.join(cwd, archive_name)
@@ -458,6 +775,7 @@ def run_command(cwd, cmd):
     elif command == "unzip":
         if len(parts) < 2:
             return cwd, ("error", "Usage: unzip <archive.zip>")
+        import zipfile
         archive_name = parts[1]
         archive_path = archive_name if os.path.isabs(archive_name) else os.path.join(cwd, archive_name)
         try:
@@ -468,15 +786,40 @@ def run_command(cwd, cmd):
             return cwd, ("error", f"Error extracting zip archive: {str(e)}")
 
     elif command == "ping":
-        if len(parts) < 2:
-            return cwd, ("error", "Usage: ping <host>")
-        host = parts[1]
         try:
-            count_flag = "-n" if platform.system().lower() == "windows" else "-c"
-            ping_proc = subprocess.run(["ping", count_flag, "4", host], capture_output=True, text=True)
-            return cwd, ("normal", ping_proc.stdout)
-        except Exception as e:
-            return cwd, ("error", f"Error pinging host: {str(e)}")
+            opts, hosts = _parse_options(parts[1:], {"-c": int, "-j": int})
+        except ValueError as e:
+            return cwd, ("error", f"{e}\nUsage: ping [-c count] [-j parallel] <host> [host...]")
+        if not hosts:
+            return cwd, ("error", "Usage: ping [-c count] [-j parallel] <host> [host...]")
+        import netprobe
+        agen = netprobe.ping_hosts(hosts, count=max(1, opts.get("-c", 4)),
+                                   concurrency=max(1, opts.get("-j", 32)))
+        return cwd, ("__stream__", netprobe.iterate(agen))
+
+    elif command == "probe":
+        usage = "Usage: probe [-c count] [-j parallel] [-t timeout] [-p port] [-f hosts.txt] <host[:port]>..."
+        try:
+            opts, targets = _parse_options(parts[1:], {"-c": int, "-j": int, "-t": float, "-p": int, "-f": str})
+        except ValueError as e:
+            return cwd, ("error", f"{e}\n{usage}")
+        if "-f" in opts:
+            hosts_file = opts["-f"] if os.path.isabs(opts["-f"]) else os.path.join(cwd, opts["-f"])
+            try:
+                with open(hosts_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.split("#", 1)[0].strip()
+                        if line:
+                            targets.append(line)
+            except OSError as e:
+                return cwd, ("error", f"Error reading {opts['-f']}: {e.strerror}")
+        if not targets:
+            return cwd, ("error", usage)
+        import netprobe
+        agen = netprobe.probe_targets(targets, count=max(1, opts.get("-c", 1)),
+                                      concurrency=max(1, opts.get("-j", 100)),
+                                      timeout=opts.get("-t", 2.0), default_port=opts.get("-p", 80))
+        return cwd, ("__stream__", netprobe.iterate(agen))
 
     elif command == "wget":
         if len(parts) < 2:
@@ -553,6 +896,85 @@ def run_command(cwd, cmd):
         os.environ[key] = value
         return cwd, ("normal", f"Set {key}={value}")
 
+    elif command == "watch":
+        interval = 2.0
+        rest = parts[1:]
+        usage = "Usage: watch [-n secs] <command>"
+        if rest and rest[0] == "-n":
+            if len(rest) < 2:
+                return cwd, ("error", usage)
+            try:
+                interval = float(rest[1])
+            except ValueError:
+                return cwd, ("error", "Interval must be a number of seconds.")
+            rest = rest[2:]
+        if not rest:
+            return cwd, ("error", usage)
+        if rest[0].lower() in ("watch", "unwatch"):
+            return cwd, ("error", f"Cannot watch '{rest[0]}'.")
+        interval = max(0.1, interval)
+        return cwd, ("__watch__", f"{interval} {' '.join(rest)}")
+
+    elif command == "unwatch":
+        return cwd, ("__unwatch__", "")
+
+    elif command == "stats":
+        usage = "Usage: stats [reset | --trace <file.json> | --jsonl <file> | --trace off]"
+        if len(parts) == 1:
+            return cwd, ("normal", metrics.METRICS.report())
+        if parts[1] == "reset" and len(parts) == 2:
+            metrics.METRICS.reset()
+            return cwd, ("normal", "Statistics reset.")
+        if parts[1] in ("--trace", "--jsonl") and len(parts) == 3:
+            if parts[2] == "off":
+                metrics.METRICS.stop_trace()
+                return cwd, ("normal", "Tracing stopped.")
+            path = parts[2] if os.path.isabs(parts[2]) else os.path.join(cwd, parts[2])
+            fmt = "chrome" if parts[1] == "--trace" else "jsonl"
+            try:
+                metrics.METRICS.start_trace(path, fmt)
+            except OSError as e:
+                return cwd, ("error", f"Error opening trace file: {e.strerror}")
+            return cwd, ("normal", f"Tracing ({fmt}) to {parts[2]}")
+        return cwd, ("error", usage)
+
+    elif command == "save-output":
+        if len(parts) < 3:
+            return cwd, ("error", "Usage: save-output <n> <file>")
+        session = capture.get_session()
+        try:
+            entry = session.get(int(parts[1]))
+        except ValueError:
+            return cwd, ("error", "Output number must be an integer.")
+        if entry is None:
+            return cwd, ("error", f"No captured output {parts[1]}")
+        dest = parts[2] if os.path.isabs(parts[2]) else os.path.join(cwd, parts[2])
+        try:
+            session.save(entry, dest)
+            return cwd, ("normal", f"Saved {entry.line_count} lines of output {entry.number} to {parts[2]}")
+        except Exception as e:
+            return cwd, ("error", f"Error saving output: {str(e)}")
+
+    elif command == "reopen":
+        session = capture.get_session()
+        if len(parts) < 2:
+            if not session.entries:
+                return cwd, ("normal", "No captured output.")
+            listing = [f"{e.number:>4} {e.line_count:>10} lines  {e.command}" for e in session.entries]
+            return cwd, ("normal", "\n".join(listing))
+        try:
+            entry = session.get(int(parts[1]))
+            page = int(parts[2]) if len(parts) >= 3 else 1
+        except ValueError:
+            return cwd, ("error", "Usage: reopen <n> [page]")
+        if entry is None:
+            return cwd, ("error", f"No captured output {parts[1]}")
+        pages = max(1, -(-entry.line_count // capture.PAGE_LINES))
+        page = max(1, min(page, pages))
+        lines = session.read_lines(entry, (page - 1) * capture.PAGE_LINES, capture.PAGE_LINES)
+        lines.append(f"-- output {entry.number}: page {page}/{pages} ({entry.line_count} lines) --")
+        return cwd, ("__reopen__", "\n".join(lines))
+
     # --- SCRIPT EXECUTION if no other command matched ---
     script_exts = ['.py', '.sh', '.wnx']
     script_path = os.path.join(cwd, stripped_cmd)
@@ -569,6 +991,8 @@ def run_command(cwd, cmd):
                         out_type, out_text = output
                     else:
                         out_type, out_text = "normal", str(output)
+                    if not isinstance(out_text, str):
+                        out_text = "\n".join(out_text)
                     if out_text:
                         output_lines.append(f"> {line}")
                         output_lines.append(out_text)
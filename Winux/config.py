@@ -0,0 +1,12 @@
+import os
+
+
+def config_dir():
+    """Directory for Winux's persistent state (~/.winux, or $WINUX_HOME)."""
+    path = os.environ.get("WINUX_HOME") or os.path.join(os.path.expanduser("~"), ".winux")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def config_path(name):
+    return os.path.join(config_dir(), name)
@@ -0,0 +1,224 @@
+import os
+import re
+import bisect
+import itertools
+import time
+import atexit
+
+from config import config_path
+
+MAX_TOTAL = 100000.0
+SAVE_INTERVAL = 30.0
+
+
+def frecency(rank, last, now):
+    age = now - last
+    if age < 3600:
+        return rank * 4
+    if age < 86400:
+        return rank * 2
+    if age < 604800:
+        return rank / 2
+    return rank / 4
+
+
+class DirIndex:
+    """
+    Frequency/recency index of visited directories, stored as 'path|rank|time'
+    lines. When the total rank grows past MAX_TOTAL every entry is aged and
+    entries that fall below 1 are pruned.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config_path("dirs")
+        self.entries = {}
+        self._lower = {}
+        self._blobs = None
+        self._score_table = None
+        self._order = None
+        self._neg_scores = []
+        self._score_time = 0.0
+        self._dirty = False
+        self._total = 0.0
+        self._last_save = time.time()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        path, rank, last = line.rstrip("\n").rsplit("|", 2)
+                        self.entries[path] = [float(rank), float(last)]
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        self._lower = {p: p.lower() for p in self.entries}
+        self._total = sum(e[0] for e in self.entries.values())
+
+    def visit(self, path, now=None):
+        now = time.time() if now is None else now
+        entry = self.entries.get(path)
+        if entry is None:
+            if "\n" in path:
+                return
+            self.entries[path] = [1.0, now]
+            self._lower[path] = path.lower()
+            self._blobs = None
+        else:
+            entry[0] += 1
+            entry[1] = now
+        if self._score_table is not None:
+            old = self._score_table.get(path)
+            new = self._score_table[path] = frecency(*self.entries[path], self._score_time)
+            self._reorder(path, old, new)
+        self._total += 1
+        self._dirty = True
+        if self._total > MAX_TOTAL:
+            self.age()
+        if now - self._last_save > SAVE_INTERVAL:
+            self.save()
+
+    def age(self, factor=0.99):
+        for path in list(self.entries):
+            entry = self.entries[path]
+            entry[0] *= factor
+            if entry[0] < 1:
+                self.remove(path)
+        self._score_table = None
+        self._order = None
+        self._total = sum(e[0] for e in self.entries.values())
+        self._dirty = True
+
+    def remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self._lower.pop(path, None)
+            if self._score_table is not None:
+                self._reorder(path, self._score_table.pop(path, None), None)
+            self._blobs = None
+            self._total -= entry[0]
+            self._dirty = True
+
+    def matches(self, terms, now=None, limit=None):
+        """
+        Returns [(score, path)] best first for paths matching every term in
+        order. Matching is case-sensitive if any term has an uppercase
+        letter, and falls back to a looser per-character match if nothing
+        matches the terms as written.
+        """
+        now = time.time() if now is None else now
+        scores = self._scores(now)
+        return [(scores[p], p) for p in itertools.islice(self._iter_matches(terms, now), limit)]
+
+    def _iter_matches(self, terms, now):
+        """Yields matching paths best first, so callers can stop at the first hit."""
+        order = self._ordered(now)
+        if not terms:
+            yield from order
+            return
+        case_sensitive = any(t != t.lower() for t in terms)
+        if not case_sensitive:
+            terms = [t.lower() for t in terms]
+        # One search over all paths joined by newlines runs in C and tells
+        # whether the terms match anything before falling back to fuzzy.
+        blob = self._blob(case_sensitive)
+        search = self._pattern(terms).search
+        if not search(blob):
+            search = self._pattern(terms, fuzzy=True).search
+            if not search(blob):
+                return
+        if case_sensitive:
+            yield from (path for path in order if search(path))
+        else:
+            lower = self._lower
+            yield from (path for path in order if search(lower[path]))
+
+    @staticmethod
+    def _pattern(terms, fuzzy=False):
+        if fuzzy:
+            # Subsequence match; [^c]*c never backtracks, unlike .*?c.
+            chars = "".join(terms)
+            pattern = re.escape(chars[0]) + "".join(
+                f"[^{re.escape(ch)}\n]*{re.escape(ch)}" for ch in chars[1:])
+        else:
+            pattern = "[^\n]*".join(re.escape(t) for t in terms)
+        return re.compile(pattern)
+
+    def _scores(self, now):
+        # Scores only change when an age bucket boundary is crossed, so a
+        # table that is up to a minute old is good enough for ranking.
+        if self._score_table is None or now - self._score_time > 60:
+            self._score_table = {p: frecency(r, t, now) for p, (r, t) in self.entries.items()}
+            self._score_time = now
+            self._order = None
+        return self._score_table
+
+    def _ordered(self, now):
+        """All paths best first, kept in step with the score table."""
+        scores = self._scores(now)
+        if self._order is None:
+            self._order = sorted(scores, key=scores.__getitem__, reverse=True)
+            self._neg_scores = [-scores[p] for p in self._order]
+        return self._order
+
+    def _reorder(self, path, old, new):
+        # Move one path within the order instead of sorting everything again.
+        if self._order is None:
+            return
+        if old is not None:
+            i = bisect.bisect_left(self._neg_scores, -old)
+            while self._order[i] != path:
+                i += 1
+            del self._order[i]
+            del self._neg_scores[i]
+        if new is not None:
+            i = bisect.bisect_left(self._neg_scores, -new)
+            self._order.insert(i, path)
+            self._neg_scores.insert(i, -new)
+
+    def _blob(self, case_sensitive):
+        if self._blobs is None:
+            self._blobs = ("\n".join(self.entries), "\n".join(self._lower.values()))
+        return self._blobs[0 if case_sensitive else 1]
+
+    def best(self, terms):
+        """Best existing directory for terms; stale entries met on the way are pruned."""
+        stale = []
+        found = None
+        for path in self._iter_matches(terms, time.time()):
+            if os.path.isdir(path):
+                found = path
+                break
+            stale.append(path)
+        if len(stale) > 64:
+            # Sorting once is cheaper than shifting the order for every path.
+            self._order = None
+        for path in stale:
+            self.remove(path)
+        return found
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(f"{p}|{r:.3f}|{int(t)}\n" for p, (r, t) in self.entries.items())
+            os.replace(tmp, self.path)
+            self._dirty = False
+            self._last_save = time.time()
+        except OSError:
+            pass
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = DirIndex()
+        atexit.register(_index.save)
+    return _index
@@ -0,0 +1,63 @@
+import queue
+import threading
+
+
+class StreamJob:
+    """
+    Drains a line iterator on a background thread so long-running commands
+    (find, grep -r, ping, probe) can show each line as soon as it is
+    produced without blocking the window. At most MAX_QUEUED lines wait to
+    be polled, so a fast producer cannot run ahead of the screen.
+    """
+
+    MAX_QUEUED = 10000
+
+    def __init__(self, command, lines, out_type="normal", entry=None):
+        self.command = command
+        self.out_type = out_type
+        # Capture entry the UI appends polled lines to.
+        self.entry = entry
+        self._source = lines
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUED)
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, line):
+        while not self._done.is_set():
+            try:
+                self._queue.put(line, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self):
+        try:
+            for line in self._source:
+                self._put(line)
+                if self._done.is_set():
+                    break
+        except Exception as e:
+            self._put(f"Error: {e}")
+        finally:
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+            self._done.set()
+
+    def poll(self, limit=None):
+        """Returns up to limit lines produced since the last call."""
+        new = []
+        while limit is None or len(new) < limit:
+            try:
+                new.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return new
+
+    @property
+    def finished(self):
+        return self._done.is_set() and self._queue.empty()
+
+    def stop(self):
+        self._done.set()
@@ -0,0 +1,135 @@
+import collections
+
+
+class TextLayout:
+    """
+    Soft-wraps scrollback lines to the window width.
+    Character widths are measured once and cached, wrapped rows are cached
+    per line and only thrown away when the width changes.
+    """
+
+    def __init__(self, font, width=0, tab_size=4, max_surfaces=2048):
+        self.font = font
+        self.width = width
+        self.tab_size = tab_size
+        self.max_surfaces = max_surfaces
+        self._advances = {}
+        self._wraps = {}
+        self._surfaces = collections.OrderedDict()
+        self.render_hits = 0
+        self.render_misses = 0
+
+    def advance(self, ch):
+        width = self._advances.get(ch)
+        if width is None:
+            width = self.font.size(ch)[0]
+            self._advances[ch] = width
+        return width
+
+    def text_width(self, text):
+        advance = self.advance
+        return sum(advance(ch) for ch in text)
+
+    def columns(self):
+        """Number of monospace cells that fit on one row."""
+        cell = self.advance("M") or 1
+        return max(1, self.width // cell)
+
+    def set_width(self, width):
+        if width != self.width:
+            self.width = width
+            self._wraps.clear()
+
+    def wrap(self, line):
+        rows = self._wraps.get(line)
+        if rows is None:
+            rows = self._wrap(line)
+            if len(self._wraps) > 100000:
+                self._wraps.clear()
+            self._wraps[line] = rows
+        return rows
+
+    def _wrap(self, line):
+        text = line.expandtabs(self.tab_size) if "\t" in line else line
+        if self.width <= 0 or not text:
+            return (text,)
+        advance = self.advance
+        rows = []
+        start = 0
+        last_space = -1
+        x = 0
+        i = 0
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            w = advance(ch)
+            if x + w > self.width and i > start:
+                if ch == " ":
+                    # The space that overflows ends this row, and the next
+                    # row starts after it.
+                    rows.append(text[start:i + 1])
+                    start = i + 1
+                    i += 1
+                    last_space = -1
+                    x = 0
+                    continue
+                if last_space > start:
+                    # Break after the last space so words stay whole.
+                    rows.append(text[start:last_space + 1])
+                    start = last_space + 1
+                else:
+                    rows.append(text[start:i])
+                    start = i
+                last_space = -1
+                x = self.text_width(text[start:i])
+                continue
+            if ch == " ":
+                last_space = i
+            x += w
+            i += 1
+        rows.append(text[start:])
+        return tuple(rows)
+
+    def visible_rows(self, history, max_rows, scroll_offset):
+        """
+        Returns (rows, scroll_offset) where rows is a list of (type, text)
+        wrapped rows ending scroll_offset rows above the bottom of history.
+        Only walks as far back as needed, so cost does not grow with the
+        length of the scrollback. scroll_offset is clamped to what exists.
+        """
+        needed = max_rows + max(0, scroll_offset)
+        collected = []
+        for idx in range(len(history) - 1, -1, -1):
+            typ, line = history[idx]
+            for row in reversed(self.wrap(line)):
+                collected.append((typ, row))
+            if len(collected) >= needed:
+                break
+        scroll_offset = max(0, min(scroll_offset, len(collected) - max_rows))
+        rows = collected[scroll_offset:scroll_offset + max_rows]
+        rows.reverse()
+        return rows, scroll_offset
+
+    def cache_stats(self):
+        lookups = self.render_hits + self.render_misses
+        return {
+            "hits": self.render_hits,
+            "misses": self.render_misses,
+            "hit_rate": f"{self.render_hits / lookups:.1%}" if lookups else "n/a",
+            "surfaces": len(self._surfaces),
+            "wrapped_lines": len(self._wraps),
+        }
+
+    def render(self, text, color):
+        key = (text, color)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.render_hits += 1
+            return surf
+        self.render_misses += 1
+        surf = self.font.render(text, True, color)
+        self._surfaces[key] = surf
+        if len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+        return surf
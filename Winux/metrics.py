@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import threading
+
+from proctable import load_psutil
+
+BUCKETS = 40
+
+
+class Histogram:
+    """
+    Fixed-size log2 histogram of durations in microseconds. Bucket i counts
+    values in [2**(i-1), 2**i) us, so recording is one bit_length call and
+    percentiles are accurate to within a factor of two.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        self.counts[min(us.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound in seconds of the bucket holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100.0
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class CommandStats:
+    __slots__ = ("latency", "bytes_read", "bytes_written", "lines")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.lines = 0
+
+
+_excluded = threading.local()
+
+# What io_counters() actually measures, for labelling the report; None
+# until it has been called.
+IO_SCOPE = None
+
+
+def exclude_io(read=0, written=0):
+    """
+    Mark bytes the terminal itself moved on this thread (such as spilling
+    output to the capture file) so they are not charged to a command.
+    """
+    _excluded.read = getattr(_excluded, "read", 0) + read
+    _excluded.written = getattr(_excluded, "written", 0) + written
+
+
+def io_counters():
+    """
+    (bytes read, bytes written) so far, less any excluded I/O, or None if
+    unknown. With /proc/thread-self these are the calling thread's own
+    rchar/wchar, so other threads (watch, streamed jobs) do not show up in
+    each other's numbers. Elsewhere (e.g. Windows via psutil) they are
+    process-wide disk bytes; IO_SCOPE says which.
+    """
+    global IO_SCOPE
+    counters = None
+    for path, scope in (("/proc/thread-self/io", "thread"), ("/proc/self/io", "process")):
+        try:
+            with open(path, "rb") as f:
+                fields = dict(line.split(b":", 1) for line in f.read().splitlines())
+            counters = int(fields[b"rchar"]), int(fields[b"wchar"])
+            IO_SCOPE = scope
+            break
+        except (OSError, KeyError, ValueError):
+            continue
+    if counters is None:
+        psutil = load_psutil()
+        if psutil is None:
+            return None
+        try:
+            io = psutil.Process().io_counters()
+            counters = io.read_bytes, io.write_bytes
+            IO_SCOPE = "process disk"
+        except Exception:
+            return None
+    return (counters[0] - getattr(_excluded, "read", 0),
+            counters[1] - getattr(_excluded, "written", 0))
+
+
+class Metrics:
+    """
+    Per-command latency/IO/line counters, frame-time histogram and gauges
+    registered by the UI (e.g. render cache stats). Optionally appends every
+    command, and frames slower than SLOW_FRAME, to a JSONL or Chrome trace
+    file for offline analysis.
+    """
+
+    SLOW_FRAME = 0.05
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = {}
+        self.frames = Histogram()
+        self.gauges = {}
+        self.trace_path = None
+        self.trace_format = None
+        self._pid = os.getpid()
+        # Measured on the first command, not at import, so starting up never
+        # touches psutil (see startup.py).
+        self._io_overhead = None
+
+    @staticmethod
+    def _measure_io_overhead():
+        # Reading /proc/self/io shows up in rchar itself; measure it once so
+        # it can be subtracted from every command.
+        first = io_counters()
+        second = io_counters()
+        if first is None or second is None:
+            return (0, 0)
+        return second[0] - first[0], second[1] - first[1]
+
+    def reset(self):
+        self.started = time.time()
+        self.commands = {}
+        self.frames = Histogram()
+
+    def register_gauge(self, name, func):
+        """func() returns a dict of values shown under name by 'stats'."""
+        self.gauges[name] = func
+
+    def record_command(self, name, start, seconds, io_before, io_after, lines):
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        stats.latency.record(seconds)
+        stats.lines += lines
+        read = written = 0
+        if self._io_overhead is None:
+            self._io_overhead = self._measure_io_overhead()
+        if io_before is not None and io_after is not None:
+            read = max(0, io_after[0] - io_before[0] - self._io_overhead[0])
+            written = max(0, io_after[1] - io_before[1] - self._io_overhead[1])
+            stats.bytes_read += read
+            stats.bytes_written += written
+        if self.trace_path:
+            self._trace("command", name, start, seconds,
+                        {"lines": lines, "bytes_read": read, "bytes_written": written})
+
+    def record_frame(self, start, seconds):
+        self.frames.record(seconds)
+        if self.trace_path and seconds >= self.SLOW_FRAME:
+            self._trace("frame", "slow frame", start, seconds, {})
+
+    def start_trace(self, path, fmt):
+        if fmt == "chrome" and (not os.path.exists(path) or os.path.getsize(path) == 0):
+            # Chrome's JSON array format tolerates a missing closing bracket,
+            # so events can be appended one at a time.
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("[\n")
+        self.trace_path = path
+        self.trace_format = fmt
+
+    def stop_trace(self):
+        self.trace_path = None
+        self.trace_format = None
+
+    def _trace(self, category, name, start, seconds, args):
+        if self.trace_format == "chrome":
+            event = {"name": name, "cat": category, "ph": "X", "ts": int(start * 1e6),
+                     "dur": int(seconds * 1e6), "pid": self._pid, "tid": 0, "args": args}
+            line = json.dumps(event) + ",\n"
+        else:
+            event = {"type": category, "name": name, "ts": start, "dur_ms": seconds * 1000}
+            event.update(args)
+            line = json.dumps(event) + "\n"
+        try:
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            self.stop_trace()
+
+    def report(self):
+        ms = 1000.0
+        lines = [f"Uptime: {time.time() - self.started:.0f}s"]
+        if self.commands:
+            lines.append(f"{'COMMAND':<12} {'COUNT':>6} {'AVG ms':>9} {'P50 ms':>9} {'P95 ms':>9} "
+                         f"{'MAX ms':>9} {'READ':>9} {'WRITTEN':>9} {'LINES':>9}")
+            for name, s in sorted(self.commands.items(), key=lambda kv: -kv[1].latency.total):
+                h = s.latency
+                lines.append(f"{name[:12]:<12} {h.count:>6} {h.mean() * ms:>9.2f} {h.percentile(50) * ms:>9.2f} "
+                             f"{h.percentile(95) * ms:>9.2f} {h.max * ms:>9.2f} {s.bytes_read:>9} "
+                             f"{s.bytes_written:>9} {s.lines:>9}")
+            if IO_SCOPE is not None and IO_SCOPE != "thread":
+                lines.append(f"READ/WRITTEN are {IO_SCOPE} I/O and include other threads' work.")
+        else:
+            lines.append("No commands recorded.")
+        f = self.frames
+        if f.count:
+            lines.append(f"Frames: {f.count}  avg {f.mean() * ms:.2f} ms  p50 {f.percentile(50) * ms:.2f} ms  "
+                         f"p95 {f.percentile(95) * ms:.2f} ms  p99 {f.percentile(99) * ms:.2f} ms  "
+                         f"max {f.max * ms:.2f} ms")
+        for name, func in self.gauges.items():
+            try:
+                values = func()
+            except Exception:
+                continue
+            lines.append(f"{name}: " + "  ".join(f"{k} {v}" for k, v in values.items()))
+        if self.trace_path:
+            lines.append(f"Tracing ({self.trace_format}) to {self.trace_path}")
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
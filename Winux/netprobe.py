@@ -0,0 +1,224 @@
+import asyncio
+import platform
+import queue
+import re
+import threading
+import time
+
+_TIME_RE = re.compile(r"time[=<]\s*([\d.]+)\s*ms", re.IGNORECASE)
+_DONE = object()
+
+
+def latency_stats(samples):
+    """Returns (min, avg, p95) of a list of latencies in ms, or None if empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    # Nearest-rank percentile.
+    p95 = ordered[max(0, -(-len(ordered) * 95 // 100) - 1)]
+    return ordered[0], sum(ordered) / len(ordered), p95
+
+
+def format_stats(samples):
+    stats = latency_stats(samples)
+    if stats is None:
+        return "no replies"
+    return "min/avg/p95 = {:.2f}/{:.2f}/{:.2f} ms".format(*stats)
+
+
+def parse_target(target, default_port):
+    """Split 'host:port' (or '[v6addr]:port') into (host, port)."""
+    if target.startswith("["):
+        host, _, rest = target[1:].partition("]")
+        port = rest.lstrip(":")
+    elif target.count(":") == 1:
+        host, port = target.split(":")
+    else:
+        host, port = target, ""
+    port = int(port) if port else default_port
+    if not host or not 1 <= port <= 65535:
+        raise ValueError(f"invalid target: {target}")
+    return host, port
+
+
+async def tcp_connect_time(host, port, timeout):
+    """Time a TCP connect to host:port in ms. Raises OSError or asyncio.TimeoutError."""
+    start = time.perf_counter()
+    _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    elapsed = (time.perf_counter() - start) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return elapsed
+
+
+async def probe_targets(targets, count=1, concurrency=100, timeout=2.0, default_port=80):
+    """
+    Async generator: TCP-probes every target with at most concurrency
+    connects in flight, yielding one line per target as it finishes and a
+    summary line at the end.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    all_samples = []
+
+    async def probe(target):
+        try:
+            host, port = parse_target(target, default_port)
+        except ValueError:
+            return f"{target:<30} invalid target", []
+        samples = []
+        error = None
+        for _ in range(count):
+            async with sem:
+                try:
+                    samples.append(await tcp_connect_time(host, port, timeout))
+                except asyncio.TimeoutError:
+                    error = "timeout"
+                except OSError as e:
+                    error = e.strerror or str(e)
+                except Exception as e:
+                    # One bad target must not abort the rest of the batch.
+                    error = str(e) or type(e).__name__
+        label = f"{host}:{port}"
+        if samples:
+            return f"{label:<30} open    {len(samples)}/{count}  {format_stats(samples)}", samples
+        return f"{label:<30} closed  ({error})", samples
+
+    tasks = [asyncio.ensure_future(probe(t)) for t in targets]
+    reachable = 0
+    try:
+        for fut in asyncio.as_completed(tasks):
+            line, samples = await fut
+            if samples:
+                reachable += 1
+                all_samples.extend(samples)
+            yield line
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield f"--- {reachable}/{len(targets)} reachable, {format_stats(all_samples)}"
+
+
+async def _ping_one(host, count, sem, prefix, samples):
+    count_flag = "-n" if platform.system().lower() == "windows" else "-c"
+    async with sem:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "ping", count_flag, str(count), host,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        except OSError as e:
+            yield f"{prefix}ping: {e.strerror or e}"
+            return
+        try:
+            while True:
+                raw = await proc.stdout.readline()
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").rstrip()
+                match = _TIME_RE.search(line)
+                if match:
+                    samples.append(float(match.group(1)))
+                if line and (not prefix or match):
+                    yield f"{prefix}{line}"
+            await proc.wait()
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+
+
+async def ping_hosts(hosts, count=4, concurrency=32):
+    """
+    Async generator running the system ping for each host concurrently and
+    yielding reply lines as they arrive, then per-host latency stats.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    out = asyncio.Queue()
+    samples = {host: [] for host in hosts}
+
+    async def run(host):
+        prefix = f"{host}: " if len(hosts) > 1 else ""
+        try:
+            async for line in _ping_one(host, count, sem, prefix, samples[host]):
+                await out.put(line)
+        finally:
+            await out.put(_DONE)
+
+    tasks = [asyncio.ensure_future(run(h)) for h in hosts]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await out.get()
+            if item is _DONE:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+    if len(hosts) > 1:
+        yield "--- ping statistics"
+        for host in hosts:
+            yield f"{host:<30} {len(samples[host])}/{count} replies  {format_stats(samples[host])}"
+
+
+def iterate(agen):
+    """
+    Run an async generator on its own event loop in a background thread and
+    return a plain generator over its items. Closing the returned generator
+    cancels the async side.
+    """
+    items = queue.Queue(maxsize=1024)
+    stop = threading.Event()
+
+    async def pump():
+        task = asyncio.current_task()
+
+        async def watch_stop():
+            while not stop.is_set():
+                await asyncio.sleep(0.1)
+            task.cancel()
+
+        watcher = asyncio.ensure_future(watch_stop())
+        try:
+            async for item in agen:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            items.put(f"Error: {e}")
+        finally:
+            watcher.cancel()
+            await agen.aclose()
+
+    def worker():
+        try:
+            asyncio.run(pump())
+        finally:
+            items.put(_DONE)
+
+    def consume():
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            # Drain so a worker blocked on put() can see stop and exit.
+            while thread.is_alive():
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    return consume()
@@ -0,0 +1,162 @@
+import os
+import re
+import sys
+import time
+
+TTL = 1.0
+
+_psutil = None
+
+
+def load_psutil():
+    """Import psutil on first use; returns None if it is not installed."""
+    global _psutil
+    if _psutil is None:
+        try:
+            import psutil
+            _psutil = psutil
+        except ImportError:
+            _psutil = False
+    return _psutil or None
+
+
+class ProcessTable:
+    """
+    Short-lived cache of process snapshots. A snapshot only fetches the
+    attributes a query asks for, and is reused by any later query needing a
+    subset of them within TTL seconds. Uses psutil when it is installed,
+    otherwise reads /proc directly on Linux or asks tasklist on Windows.
+    """
+
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._snapshot = None
+        self._attrs = frozenset()
+        self._taken = 0.0
+        self._users = {}
+        self.psutil = load_psutil()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def snapshot(self, attrs=("pid", "name")):
+        """Returns a list of dicts holding pid plus the requested attrs."""
+        wanted = frozenset(attrs) | {"pid"}
+        now = time.monotonic()
+        if self._snapshot is not None and wanted <= self._attrs and now - self._taken < self.ttl:
+            return self._snapshot
+        if self.psutil is not None:
+            procs = self._from_psutil(wanted)
+        elif os.path.isdir("/proc/self"):
+            procs = self._from_proc(wanted)
+        elif sys.platform == "win32":
+            procs = self._from_tasklist(wanted)
+        else:
+            raise OSError("No way to list processes on this system (install psutil).")
+        self._snapshot, self._attrs, self._taken = procs, wanted, time.monotonic()
+        return procs
+
+    def _from_psutil(self, wanted):
+        names = [a for a in wanted if a != "rss"]
+        if "rss" in wanted:
+            names.append("memory_info")
+        procs = []
+        for p in self.psutil.process_iter(names):
+            info = dict(p.info)
+            if "rss" in wanted:
+                mem = info.pop("memory_info", None)
+                info["rss"] = mem.rss if mem is not None else 0
+            if "cmdline" in wanted:
+                info["cmdline"] = " ".join(info.get("cmdline") or [])
+            info["name"] = info.get("name") or ""
+            if "username" in wanted:
+                info["username"] = info.get("username") or ""
+            procs.append(info)
+        return procs
+
+    def _from_proc(self, wanted):
+        page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        procs = []
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            info = {"pid": int(entry.name)}
+            try:
+                if "name" in wanted:
+                    with open(f"/proc/{entry.name}/comm", "r", encoding="utf-8", errors="replace") as f:
+                        info["name"] = f.read().rstrip("\n")
+                if "cmdline" in wanted:
+                    with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                        info["cmdline"] = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+                if "username" in wanted:
+                    info["username"] = self._user(entry.stat().st_uid)
+                if "rss" in wanted:
+                    with open(f"/proc/{entry.name}/statm", "r") as f:
+                        info["rss"] = int(f.read().split()[1]) * page_size
+            except (OSError, ValueError, IndexError):
+                # The process exited while we were reading it.
+                continue
+            procs.append(info)
+        return procs
+
+    def _user(self, uid):
+        name = self._users.get(uid)
+        if name is None:
+            try:
+                import pwd
+                name = pwd.getpwuid(uid).pw_name
+            except (ImportError, KeyError):
+                name = str(uid)
+            self._users[uid] = name
+        return name
+
+    def _from_tasklist(self, wanted):
+        import csv
+        import subprocess
+        args = ["tasklist", "/fo", "csv", "/nh"]
+        if "username" in wanted:
+            args.append("/v")
+        out = subprocess.run(args, capture_output=True, text=True).stdout
+        procs = []
+        for row in csv.reader(out.splitlines()):
+            if len(row) < 5:
+                continue
+            try:
+                info = {"pid": int(row[1]), "name": row[0], "cmdline": row[0]}
+            except ValueError:
+                continue
+            digits = "".join(ch for ch in row[4] if ch.isdigit())
+            info["rss"] = int(digits) * 1024 if digits else 0
+            if "username" in wanted:
+                info["username"] = row[6] if len(row) > 6 else ""
+            procs.append(info)
+        return procs
+
+    def find(self, pattern, full=False):
+        """Processes whose name (or full command line) matches the regex pattern."""
+        regex = re.compile(pattern)
+        key = "cmdline" if full else "name"
+        own = os.getpid()
+        return [p for p in self.snapshot(("pid", "name", key)) if p["pid"] != own and regex.search(p.get(key) or "")]
+
+    def terminate(self, pid, force=False):
+        if self.psutil is not None:
+            p = self.psutil.Process(pid)
+            if force:
+                p.kill()
+            else:
+                p.terminate()
+        else:
+            import signal
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM) if force else signal.SIGTERM)
+        self.invalidate()
+
+
+_table = None
+
+
+def get_table():
+    global _table
+    if _table is None:
+        _table = ProcessTable()
+    return _table
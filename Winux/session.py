@@ -0,0 +1,229 @@
+import os
+import json
+import struct
+import zlib
+
+from capture import saved_line
+from config import config_path
+
+MAGIC = b"WXS1"
+# kind, flags, line count, payload length
+_HEADER = struct.Struct(">cBII")
+_COMPRESSED = 1
+
+LINES = b"L"
+CLEAR = b"C"
+
+CHUNK_LINES = 4096
+COMPRESS_MIN = 512
+# Once the file grows past MAX_BYTES, the oldest chunks are dropped so that
+# about RETAIN_LINES lines (and at most half of MAX_BYTES) remain.
+MAX_BYTES = 16 * 1024 * 1024
+RETAIN_LINES = 50000
+
+TYPE_CODES = {"normal": "n", "error": "e", "warning": "w", "dirlist": "d", "changed": "n"}
+CODE_TYPES = {"n": "normal", "e": "error", "w": "warning", "d": "dirlist"}
+
+
+def _encode_lines(lines):
+    payload = "\n".join(TYPE_CODES.get(typ, "n") + (saved_line(text) if typ == "warning" else text).replace("\n", " ")
+                        for typ, text in lines)
+    return payload.encode("utf-8", "replace")
+
+
+def _decode_lines(payload):
+    return [(CODE_TYPES.get(item[:1], "normal"), item[1:]) for item in payload.decode("utf-8").split("\n")]
+
+
+class SessionStore:
+    """
+    Append-only binary session file: a magic header followed by
+    length-prefixed records. LINES records hold a chunk of scrollback,
+    optionally zlib-compressed; CLEAR drops all scrollback before it.
+    The small cwd/theme/history state lives in a JSON file next to it that
+    is rewritten atomically whenever it changes.
+
+    load() only reads record headers, then decompresses the chunks needed
+    for the visible tail. Older chunks are read by load_older() on demand.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config_path("session.wxs")
+        self.state_path = os.path.splitext(self.path)[0] + ".json"
+        self.state = {}
+        self.written = 0
+        self._older = []
+        self._live_start = 0
+        self._dead_bytes = 0
+        self._cleared = False
+
+    def load(self, tail_lines):
+        """Returns the last tail_lines (or more) scrollback lines of the saved session."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        try:
+            with open(self.path, "rb") as f:
+                records = self._scan(f)
+        except OSError:
+            return []
+        if records is None:
+            # Not a session file we understand; start a fresh one.
+            os.remove(self.path)
+            return []
+        self._dead_bytes = self._live_start
+        self._older = records
+
+        lines = []
+        while self._older and len(lines) < tail_lines:
+            lines[0:0] = self._read_chunk(self._older.pop())
+        self.written = len(lines)
+        return lines
+
+    def _scan(self, f):
+        """Read record headers only, seeking past every payload."""
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        records = []
+        offset = len(MAGIC)
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, flags, count, length = _HEADER.unpack(header)
+            body = offset + _HEADER.size
+            if body + length > size:
+                break
+            if kind == CLEAR:
+                records = []
+                self._live_start = body
+            elif kind == LINES:
+                records.append((body, flags, count, length))
+            f.seek(body + length)
+            offset = body + length
+        if offset < size:
+            # A torn final record from a crash mid-write; drop it.
+            f.close()
+            with open(self.path, "r+b") as out:
+                out.truncate(offset)
+        return records
+
+    def clear(self):
+        """The scrollback was cleared; the next save starts it over."""
+        # Nothing from before the clear may be paged back in.
+        self._older = []
+        self.written = 0
+        self._cleared = True
+
+    def trim(self, count):
+        """
+        The first count lines of history, already saved, were dropped from
+        memory. They stay in the file for the next launch, but are not paged
+        back in during this one.
+        """
+        self.written = max(0, self.written - count)
+        self._older = []
+
+    def has_older(self):
+        return bool(self._older)
+
+    def load_older(self):
+        """Returns the chunk of lines just before what has been loaded so far."""
+        if not self._older:
+            return []
+        lines = self._read_chunk(self._older.pop())
+        self.written += len(lines)
+        return lines
+
+    def _read_chunk(self, record):
+        body, flags, count, length = record
+        with open(self.path, "rb") as f:
+            f.seek(body)
+            payload = f.read(length)
+        if flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        return _decode_lines(payload)
+
+    def _write_record(self, f, kind, payload, count=0):
+        flags = 0
+        if kind == LINES and len(payload) >= COMPRESS_MIN:
+            payload = zlib.compress(payload, 1)
+            flags |= _COMPRESSED
+        f.write(_HEADER.pack(kind, flags, count, len(payload)))
+        f.write(payload)
+
+    def save(self, history, state, stable=None):
+        """
+        Append the lines of history not yet written (up to index stable) and
+        write the current state if it changed. If history shrank (e.g. clear), the scrollback is
+        reset and written again from the start.
+        """
+        stable = len(history) if stable is None else stable
+        size = self._file_size()
+        if size > MAX_BYTES:
+            self._retain()
+        elif self._dead_bytes > (1 << 20) and self._dead_bytes * 2 > size:
+            self._compact()
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "ab") as f:
+            if new_file:
+                f.write(MAGIC)
+            if self._cleared or stable < self.written:
+                self._write_record(f, CLEAR, b"")
+                self._older = []
+                self._dead_bytes = f.tell()
+                self._cleared = False
+                self.written = 0
+            for start in range(self.written, stable, CHUNK_LINES):
+                chunk = history[start:min(stable, start + CHUNK_LINES)]
+                self._write_record(f, LINES, _encode_lines(chunk), len(chunk))
+            self.written = max(self.written, stable)
+        if state != self.state:
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+            self.state = dict(state)
+
+    def _file_size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _retain(self):
+        """Drop the oldest chunks so the file is back within MAX_BYTES."""
+        with open(self.path, "rb") as f:
+            records = self._scan(f)
+        if not records:
+            return
+        kept_lines = kept_bytes = 0
+        start = records[-1][0] - _HEADER.size
+        for body, _, count, length in reversed(records):
+            if kept_lines >= RETAIN_LINES or kept_bytes + length > MAX_BYTES // 2:
+                break
+            kept_lines += count
+            kept_bytes += _HEADER.size + length
+            start = body - _HEADER.size
+        self._dead_bytes = start
+        self._compact()
+
+    def _compact(self):
+        """Rewrite the file without the records before offset _dead_bytes."""
+        tmp = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp, "wb") as out:
+            out.write(MAGIC)
+            base = out.tell() - self._dead_bytes
+            src.seek(self._dead_bytes)
+            while True:
+                block = src.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+        os.replace(tmp, self.path)
+        self._older = [(body + base, flags, count, length) for body, flags, count, length in self._older
+                       if body > self._dead_bytes]
+        self._dead_bytes = 0
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+
+import pygame
+
+from config import config_path
+
+FONT_CACHE = "fonts.json"
+
+
+def load_font(name, size):
+    """
+    Load a system font without scanning the font list on every launch.
+    The path pygame resolves for name is cached between runs, and so is a
+    failed lookup, which falls back to pygame's default font (delete
+    fonts.json to look again after installing the font).
+    """
+    cache_file = config_path(FONT_CACHE)
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    path = cache.get(name)
+    if path == "":
+        return pygame.font.Font(None, size)
+    if path and os.path.isfile(path):
+        try:
+            return pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            pass
+
+    # SysFont would do the same lookup and fall back to the default font.
+    path = pygame.font.match_font(name) or ""
+    cache[name] = path
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+    return pygame.font.Font(path or None, size)
+
+
+class StartupProfile:
+    """Records how long each startup phase took (enabled by --startup-profile)."""
+
+    def __init__(self, enabled, start=None):
+        self.enabled = enabled
+        self.phases = []
+        # start lets the caller include work done before the profile existed,
+        # such as importing modules.
+        self.start = self.last = time.perf_counter() if start is None else start
+
+    def mark(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases.append((phase, now - self.last))
+            self.last = now
+
+    def report(self):
+        lines = ["Startup profile:"]
+        for phase, elapsed in self.phases:
+            lines.append(f"  {phase:<20} {elapsed * 1000:8.1f} ms")
+        lines.append(f"  {'total':<20} {(self.last - self.start) * 1000:8.1f} ms")
+        return lines
@@ -0,0 +1,62 @@
+import threading
+
+
+class Watcher:
+    """
+    Re-runs a Winux command every interval seconds on a background thread.
+    Only the most recent result is kept; the UI picks it up with poll().
+    """
+
+    def __init__(self, run, cwd, command, interval):
+        self.run = run
+        self.cwd = cwd
+        self.command = command
+        self.interval = interval
+        self.lines = []
+        self._result = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                _, output = self.run(self.cwd, self.command, record_history=False)
+                if isinstance(output, tuple) and len(output) == 2:
+                    out_type, out_text = output
+                else:
+                    out_type, out_text = "normal", str(output)
+                if not isinstance(out_text, str):
+                    out_text = "\n".join(out_text)
+                result = (out_type, out_text.split("\n"))
+            except Exception as e:
+                # Keep watching; the command may succeed on a later run.
+                result = ("error", [f"watch: {self.command}: {e}"])
+            with self._lock:
+                self._result = result
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """
+        Returns (type, lines, changed) for a result not yet seen, where changed
+        is the set of line indexes that differ from the previous run, or None
+        if nothing new has arrived or the output did not change.
+        """
+        with self._lock:
+            result, self._result = self._result, None
+        if result is None:
+            return None
+        out_type, lines = result
+        if lines == self.lines:
+            return None
+        previous = self.lines
+        if previous:
+            changed = {i for i, line in enumerate(lines) if i >= len(previous) or previous[i] != line}
+        else:
+            changed = set()
+        self.lines = lines
+        return out_type, lines, changed
+
+    def stop(self):
+        self._stop.set()
@@ -1,14 +1,31 @@
+import time
+
+# Taken before the other imports so --startup-profile can report them.
+IMPORT_START = time.perf_counter()
+
 import pygame
 import os
 import sys
 import platform
 from prompt import Prompt
-from commands import run_command
+from layout import TextLayout
+from commands import run_command, set_terminal_columns
+from capture import get_session, close_session, lines_over_budget
+from startup import load_font, StartupProfile
+from watch import Watcher
+from jobs import StreamJob
+from session import SessionStore
+from metrics import METRICS
 
 if os.name == 'nt':
     import ctypes
     ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
 
+# Lines moved from a streamed command onto the screen per frame, and how
+# many may arrive before the scrollback is trimmed to the memory budget.
+STREAM_LINES_PER_FRAME = 2000
+STREAM_TRIM_LINES = 20000
+
 THEMES = {
     "default": {
         "bg": (10, 10, 10),
@@ -17,6 +34,7 @@ THEMES = {
         "warning": (255, 165, 0),
         "dirlist": (120, 180, 255),
         "suggestion": (100, 100, 100),
+        "changed": (120, 230, 120),
     },
     "solarized": {
         "bg": (0, 43, 54),
@@ -25,6 +43,7 @@ THEMES = {
         "warning": (181, 137, 0),
         "dirlist": (38, 139, 210),
         "suggestion": (147, 161, 161),
+        "changed": (133, 153, 0),
     },
     "dracula": {
         "bg": (40, 42, 54),
@@ -33,6 +52,7 @@ THEMES = {
         "warning": (241, 250, 140),
         "dirlist": (139, 233, 253),
         "suggestion": (98, 114, 164),
+        "changed": (80, 250, 123),
     },
 }
 
@@ -57,36 +77,53 @@ def get_completions(cwd, curr_input, commands_list):
     return sorted(set(completions))
 
 
+def describe_platform():
+    release = platform.release()
+    version = platform.version()
+    return f"Windows {release} (Build {version})"
+
+
 def main():
     global current_theme
 
+    profile = StartupProfile("--startup-profile" in sys.argv[1:], IMPORT_START)
+    profile.mark("imports")
     pygame.init()
+    profile.mark("pygame init")
     windowed_size = (800, 600)
     is_fullscreen = False
     win = pygame.display.set_mode(windowed_size, pygame.RESIZABLE)
     pygame.display.set_caption("Winux")
+    # Show the (empty) window before doing any of the slower setup below.
+    win.fill(current_theme["bg"])
+    pygame.display.flip()
+    profile.mark("window")
 
     try:
         icon = pygame.image.load("icon.png")
         pygame.display.set_icon(icon)
     except pygame.error:
         print("Warning: Could not load icon.png file. Make sure it exists in the script folder.")
+    profile.mark("icon")
 
-    font = pygame.font.SysFont('Consolas', 16)
+    font = load_font('Consolas', 16)
+    profile.mark("font")
 
     commands_list = [
         "cd", "ls", "mkdir", "pwd", "rm", "cat", "touch", "echo", "clear",
         "help", "cp", "mv", "find", "grep", "head", "tail", "chmod", "chown",
         "ln", "ps", "kill", "top", "df", "du", "tar", "zip", "unzip",
         "ping", "wget", "curl", "hostname", "whoami", "date", "history",
-        "exit", "env", "set", "theme"
+        "exit", "env", "set", "theme", "reopen", "save-output",
+        "watch", "unwatch", "probe", "z", "j", "pgrep", "pkill", "stats"
     ]
 
     history = []
-
-    release = platform.release()
-    version = platform.version()
-    windows_version_full = f"Windows {release} (Build {version})"
+    store = None
+    if "--no-session" not in sys.argv[1:]:
+        store = SessionStore()
+        history = store.load(tail_lines=500)
+    profile.mark("session restore")
 
     intro_lines = [
         "",
@@ -101,11 +138,13 @@ def main():
         "",                                               
         "",                                               
         "Welcome to Winux Terminal [v1.0.0]",
-        f"Running on {windows_version_full}",
+        "Running on ...",
         "(c) 2025 Winux Team [DE0Dev, sheerbomb905]. Tux and Windows in harmony.",
         ""
     ]
 
+    # Platform probing can be slow, so it is filled in after the first frame.
+    platform_line = len(history) + intro_lines.index("Running on ...")
     for line in intro_lines:
         history.append(("normal", line))
 
@@ -113,25 +152,94 @@ def main():
     cwd = os.path.expanduser("~/Desktop")
     if not os.path.isdir(cwd):
         cwd = os.path.expanduser("~")
+    saved_state = store.state if store is not None else {}
+    if os.path.isdir(saved_state.get("cwd", "")):
+        cwd = saved_state["cwd"]
+    if saved_state.get("theme") in THEMES:
+        current_theme = THEMES[saved_state["theme"]]
 
     prompt = Prompt(font, cwd)
+    layout = TextLayout(font, windowed_size[0] - 20)
+    METRICS.register_gauge("Render cache", layout.cache_stats)
     scroll_offset = 0
-    command_history = []
+    command_history = list(saved_state.get("commands", []))
     command_history_index = -1
     completions = []
     show_completions = False
     completion_index = 0
+    watcher = None
+    watch_start = 0
+    stream_job = None
+    # Lines streamed in since the scrollback was last trimmed.
+    streamed = 0
     running = True
     clock = pygame.time.Clock()
+    last_save = pygame.time.get_ticks()
+
+    def session_state():
+        theme_name = next((name for name, theme in THEMES.items() if theme is current_theme), "default")
+        return {"cwd": cwd, "theme": theme_name, "commands": command_history[-1000:]}
+
+    def save_session():
+        # Lines in an active watch region are still changing; only save up to it.
+        try:
+            store.save(history, session_state(), watch_start if watcher is not None else None)
+        except OSError as e:
+            print(f"Warning: could not save session: {e}")
+
+    def trim_history():
+        """
+        Drop the oldest scrollback lines past the capture memory budget.
+        Their output is still on disk (reopen <n>) and in the session file.
+        Returns how many lines were dropped from the front of history.
+        """
+        limit = watch_start if watcher is not None else len(history)
+        cut = lines_over_budget(history, get_session().memory_budget, limit)
+        if cut and store is not None:
+            # Only drop lines the session file already has.
+            save_session()
+            cut = min(cut, store.written)
+            store.trim(cut)
+        del history[:cut]
+        return cut
 
     while running:
+        frame_wall = time.time()
+        frame_start = time.perf_counter()
         line_height = font.get_height() + 2
         win_size = win.get_size()
         max_visible_lines = win_size[1] // line_height - 3
-        max_scroll = max(0, len(history) - max_visible_lines)
-        scroll_offset = max(0, min(scroll_offset, max_scroll))
-        start_line = max(0, len(history) - max_visible_lines - scroll_offset)
-        visible_history = history[start_line:start_line + max_visible_lines]
+        if watcher is not None:
+            result = watcher.poll()
+            if result is not None:
+                out_type, lines, changed = result
+                # The watch region is always the tail of history; replace it in place.
+                history[watch_start:] = [("changed" if i in changed else out_type, line)
+                                         for i, line in enumerate(lines)]
+        if stream_job is not None:
+            lines = stream_job.poll(STREAM_LINES_PER_FRAME)
+            if lines:
+                get_session().append(stream_job.entry, lines)
+                history.extend((stream_job.out_type, line) for line in lines)
+                streamed += len(lines)
+            if stream_job.finished:
+                stream_job = None
+            if streamed >= STREAM_TRIM_LINES or (streamed and stream_job is None):
+                trim_history()
+                streamed = 0
+        layout.set_width(win_size[0] - 20)
+        set_terminal_columns(layout.columns())
+        wanted_offset = scroll_offset
+        visible_history, scroll_offset = layout.visible_rows(history, max_visible_lines, scroll_offset)
+        if store is not None and store.has_older() and (
+                scroll_offset < wanted_offset or len(visible_history) < max_visible_lines):
+            # Scrolled past what has been restored; pull in the next older chunk.
+            older = store.load_older()
+            history[0:0] = older
+            watch_start += len(older)
+            if platform_line is not None:
+                platform_line += len(older)
+            visible_history, scroll_offset = layout.visible_rows(history, max_visible_lines, wanted_offset)
 
         win.fill(current_theme["bg"])
         y = 0
@@ -143,9 +251,11 @@ def main():
                 color = current_theme["warning"]
             elif typ == "dirlist":
                 color = current_theme["dirlist"]
+            elif typ == "changed":
+                color = current_theme["changed"]
             else:
                 color = current_theme["text"]
-            line_surf = font.render(line, True, color)
+            line_surf = layout.render(line, color)
             win.blit(line_surf, (10, y))
             y += line_height
 
@@ -165,6 +275,18 @@ def main():
                 y += line_height
 
         pygame.display.flip()
+        METRICS.record_frame(frame_wall, time.perf_counter() - frame_start)
+
+        if platform_line is not None:
+            profile.mark("first frame")
+            if platform_line < len(history):
+                history[platform_line] = ("normal", f"Running on {describe_platform()}")
+            platform_line = None
+            profile.mark("platform probe")
+            if profile.enabled:
+                for line in profile.report():
+                    print(line)
+                    history.append(("normal", line))
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -202,6 +324,12 @@ def main():
                         if curr_input.strip():
                             command_history.append(curr_input)
                             command_history_index = -1
+                            if watcher is not None:
+                                watcher.stop()
+                                watcher = None
+                            if stream_job is not None:
+                                stream_job.stop()
+                                stream_job = None
                             history.append(("normal", f"{cwd}> {curr_input}"))
                             cwd, output = run_command(cwd, curr_input)
 
@@ -212,18 +340,48 @@ def main():
                                 out_type, out_text = output
                                 if out_type == "__clear__":
                                     history = []
+                                    if store is not None:
+                                        store.clear()
                                 elif out_type == "theme":
                                     current_theme = THEMES.get(out_text, THEMES["default"])   # bookmark ping fix
                                     history.append(("normal", f"Theme set to {out_text}"))
-                                else:
+                                elif out_type == "__watch__":
+                                    interval, watch_cmd = out_text.split(" ", 1)
+                                    history.append(("normal", f"Every {interval}s: {watch_cmd}  (Esc or unwatch to stop)"))
+                                    watch_start = len(history)
+                                    watcher = Watcher(run_command, cwd, watch_cmd, float(interval))
+                                elif out_type == "__stream__":
+                                    stream_job = StreamJob(curr_input, out_text, "normal",
+                                                           get_session().start(curr_input, "normal"))
+                                elif out_type == "__unwatch__":
+                                    history.append(("normal", "Watch stopped."))
+                                elif out_type == "__reopen__":
                                     for line in out_text.split("\n"):
-                                        history.append((out_type, line))
+                                        history.append(("normal", line))
+                                elif not isinstance(out_text, str):
+                                    # cat, find, grep, ls: lines are produced lazily and may take
+                                    # long, so read them off the UI thread like ping and probe.
+                                    stream_job = StreamJob(curr_input, out_text, out_type,
+                                                           get_session().start(curr_input, out_type))
+                                else:
+                                    entry, lines = get_session().record(curr_input, out_type, out_text)
+                                    history.extend(lines)
                             else:
-                                for line in str(output).split("\n"):
-                                    history.append(("normal", line))
+                                entry, lines = get_session().record(curr_input, "normal", str(output))
+                                history.extend(lines)
+                            watch_start -= trim_history()
                         curr_input = ""
                         scroll_offset = 0
 
+                    elif event.key == pygame.K_ESCAPE:
+                        if watcher is not None:
+                            watcher.stop()
+                            watcher = None
+                        if stream_job is not None:
+                            stream_job.stop()
+                            stream_job = None
+                            history.append(("warning", "Interrupted."))
+
                     elif event.key == pygame.K_BACKSPACE:
                         curr_input = curr_input[:-1]
                         command_history_index = -1
@@ -269,8 +427,19 @@ def main():
                             curr_input += event.unicode
                             command_history_index = -1
 
+        if store is not None and pygame.time.get_ticks() - last_save > 30000:
+            save_session()
+            last_save = pygame.time.get_ticks()
+
         clock.tick(30)
 
+    if watcher is not None:
+        watcher.stop()
+    if stream_job is not None:
+        stream_job.stop()
+    close_session()
+    if store is not None:
+        save_session()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Winux"))
+# Keep persistent state (~/.winux) out of the user's home directory.
+os.environ["WINUX_HOME"] = tempfile.mkdtemp(prefix="winux-test-")
@@ -0,0 +1,22 @@
+import capture
+
+
+def test_lines_over_budget_trims_oldest_first():
+    history = [("normal", "x" * 9)] * 100
+    assert capture.lines_over_budget(history, 1000) == 0
+    assert capture.lines_over_budget(history, 500) == 50
+    assert capture.lines_over_budget(history, 500, limit=20) == 20
+
+
+def test_streamed_entry_is_written_as_it_arrives(tmp_path):
+    session = capture.OutputCapture(directory=str(tmp_path))
+    entry = session.start("find /", "dirlist")
+    session.append(entry, ["a", "b"])
+    assert session.read_lines(entry, 0, 10) == ["a", "b"]
+    session.append(entry, [f"x{i}" for i in range(3000)])
+    assert entry.line_count == 3002
+    assert session.read_lines(entry, 2500, 2) == ["x2498", "x2499"]
+    other, lines = session.record("pwd", "normal", "/tmp")
+    assert (other.number, lines) == (2, [("normal", "/tmp")])
+    assert session.read_lines(entry, 3001, 5) == ["x2999"]
+    session.close()
@@ -0,0 +1,76 @@
+import os
+
+import capture
+import commands
+import frecency
+import metrics
+from commands import run_command
+
+
+def test_cat_non_utf8_file_does_not_raise(tmp_path):
+    (tmp_path / "data.bin").write_bytes(b"ok\n\xff\xfe\x80 bad\n")
+    cwd, (out_type, out_text) = run_command(str(tmp_path), "cat data.bin")
+    (tmp_path / "capture").mkdir()
+    session = capture.OutputCapture(directory=str(tmp_path / "capture"))
+    entry, lines = session.record("cat data.bin", out_type, out_text)
+    assert out_type == "normal"
+    assert [text for _, text in lines] == ["ok", "��� bad"]
+    assert entry.line_count == 2
+    session.close()
+
+
+def test_z_without_history_does_not_bump_rank(tmp_path):
+    target = tmp_path / "project"
+    target.mkdir()
+    index = frecency.get_index()
+    index.visit(str(target))
+    rank = index.entries[str(target)][0]
+    cwd, (out_type, _) = run_command(str(tmp_path), "z project", record_history=False)
+    assert (cwd, out_type) == (str(target), "normal")
+    assert index.entries[str(target)][0] == rank
+    run_command(str(tmp_path), "z project")
+    assert index.entries[str(target)][0] == rank + 1
+
+
+def test_streamed_io_excludes_capture_writes(tmp_path):
+    (tmp_path / "big.txt").write_text(("x" * 99 + "\n") * 6000)
+    metrics.METRICS.reset()
+    cwd, (out_type, out_text) = run_command(str(tmp_path), "cat big.txt")
+    (tmp_path / "capture").mkdir()
+    session = capture.OutputCapture(directory=str(tmp_path / "capture"))
+    entry, _ = session.record("cat big.txt", out_type, out_text)
+    session.close()
+    stats = metrics.METRICS.commands["cat"]
+    assert entry.end - entry.start == 600000
+    assert stats.lines == 6000
+    assert stats.bytes_read >= 600000
+    assert stats.bytes_written < 4096
+
+
+def test_ls_uses_columns_set_by_ui(tmp_path, monkeypatch):
+    monkeypatch.delenv("COLUMNS", raising=False)
+    for name in ("aaaa", "bbbb", "cccc", "dddd"):
+        (tmp_path / name).touch()
+    commands.set_terminal_columns(12)
+    try:
+        _, (_, narrow) = run_command(str(tmp_path), "ls")
+        narrow = list(narrow)
+        commands.set_terminal_columns(80)
+        _, (_, wide) = run_command(str(tmp_path), "ls")
+        wide = list(wide)
+    finally:
+        commands.set_terminal_columns(None)
+    assert len(narrow) == 2
+    assert wide == ["aaaa  bbbb  cccc  dddd"]
+    assert "COLUMNS" not in os.environ
+
+
+def test_io_overhead_is_measured_on_first_command(monkeypatch):
+    def unavailable():
+        raise AssertionError("io_counters() called at construction")
+
+    monkeypatch.setattr(metrics, "io_counters", unavailable)
+    stats = metrics.Metrics()
+    monkeypatch.setattr(metrics, "io_counters", lambda: (10, 0))
+    stats.record_command("pwd", 0.0, 0.001, (0, 0), (0, 0), 1)
+    assert stats._io_overhead == (0, 0)
@@ -0,0 +1,32 @@
+import time
+
+from frecency import DirIndex
+
+
+def test_best_skips_and_prunes_stale_entries(tmp_path):
+    index = DirIndex(str(tmp_path / "dirs"))
+    now = time.time()
+    live = tmp_path / "proj-live"
+    live.mkdir()
+    index.visit(str(live), now - 86400 * 30)
+    for i in range(40):
+        index.visit(str(tmp_path / f"proj-gone-{i}"), now)
+
+    assert index.best(["proj"]) == str(live)
+    assert list(index.entries) == [str(live)]
+    assert index.best(["nothing"]) is None
+
+
+def test_matches_stay_ranked_after_visits(tmp_path):
+    index = DirIndex(str(tmp_path / "dirs"))
+    now = time.time()
+    for name in ("alpha", "beta", "gamma"):
+        index.visit(f"/srv/{name}", now)
+    assert index.matches(["srv"], now=now)[0][0] == 4.0
+
+    index.visit("/srv/gamma", now)
+    index.visit("/srv/gamma", now)
+    index.visit("/srv/beta", now)
+    assert [p for _, p in index.matches(["srv"], now=now)] == ["/srv/gamma", "/srv/beta", "/srv/alpha"]
+    assert [p for _, p in index.matches(["sga"], now=now)] == ["/srv/gamma"]
+    assert index.matches(["srv"], now=now, limit=1) == [(12.0, "/srv/gamma")]
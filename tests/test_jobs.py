@@ -0,0 +1,43 @@
+import time
+
+from jobs import StreamJob
+
+
+def drain(job, timeout=5.0):
+    lines = []
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        lines += job.poll(100)
+        time.sleep(0.001)
+    return lines + job.poll()
+
+
+def test_poll_returns_lines_in_order_up_to_limit():
+    job = StreamJob("seq", (str(i) for i in range(1000)))
+    assert drain(job) == [str(i) for i in range(1000)]
+
+
+def test_queue_is_bounded_and_stop_releases_producer(monkeypatch):
+    monkeypatch.setattr(StreamJob, "MAX_QUEUED", 10)
+    produced = []
+
+    def endless():
+        while True:
+            produced.append(None)
+            yield "y"
+
+    job = StreamJob("yes", endless())
+    time.sleep(0.2)
+    assert len(produced) <= 12
+    assert len(job.poll(5)) == 5
+    job.stop()
+    job._thread.join(2)
+    assert not job._thread.is_alive()
+
+
+def test_source_error_becomes_a_line():
+    def failing():
+        yield "ok"
+        raise OSError("gone")
+
+    assert drain(StreamJob("bad", failing())) == ["ok", "Error: gone"]
@@ -0,0 +1,55 @@
+from layout import TextLayout
+
+
+class StubFont:
+    """Monospace font where every character is one pixel wide."""
+
+    def __init__(self):
+        self.measured = 0
+
+    def size(self, text):
+        self.measured += 1
+        return len(text), 1
+
+
+def test_wrap_breaks_at_spaces():
+    layout = TextLayout(StubFont(), width=10)
+    assert layout.wrap("short") == ("short",)
+    assert layout.wrap("aaaa bbbbb c") == ("aaaa bbbbb ", "c")
+    assert layout.wrap("aaaa bbbbbb c") == ("aaaa ", "bbbbbb c")
+    assert layout.wrap("x" * 25) == ("x" * 10, "x" * 10, "x" * 5)
+    assert layout.wrap("") == ("",)
+
+
+def test_tabs_expand_before_wrapping():
+    layout = TextLayout(StubFont(), width=10, tab_size=4)
+    assert layout.wrap("a\tb") == ("a   b",)
+    assert layout.wrap("ab\tcdefghij") == ("ab  ", "cdefghij")
+
+
+def test_width_change_drops_cached_wraps():
+    font = StubFont()
+    layout = TextLayout(font, width=10)
+    assert layout.wrap("aaaa bbbb cccc") == ("aaaa bbbb ", "cccc")
+    measured = font.measured
+    assert layout.wrap("aaaa bbbb cccc") == ("aaaa bbbb ", "cccc")
+    layout.set_width(10)
+    assert layout.wrap("aaaa bbbb cccc") == ("aaaa bbbb ", "cccc")
+    assert font.measured == measured
+    layout.set_width(5)
+    assert layout.wrap("aaaa bbbb cccc") == ("aaaa ", "bbbb ", "cccc")
+    assert layout.columns() == 5
+
+
+def test_visible_rows_clamps_scroll_offset():
+    layout = TextLayout(StubFont(), width=10)
+    history = [("normal", f"line {i}") for i in range(5)] + [("error", "x" * 15)]
+    rows, offset = layout.visible_rows(history, 3, 0)
+    assert (rows, offset) == ([("normal", "line 4"), ("error", "x" * 10), ("error", "x" * 5)], 0)
+    rows, offset = layout.visible_rows(history, 3, 2)
+    assert offset == 2
+    assert rows == [("normal", "line 2"), ("normal", "line 3"), ("normal", "line 4")]
+    rows, offset = layout.visible_rows(history, 3, 100)
+    assert offset == 4
+    assert rows[0] == ("normal", "line 0")
+    assert layout.visible_rows(history, 3, -5)[1] == 0
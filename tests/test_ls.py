@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+import commands
+from commands import run_command
+
+
+@pytest.fixture
+def tree(tmp_path):
+    commands.set_terminal_columns(80)
+    (tmp_path / "big.txt").write_bytes(b"x" * 100000)
+    (tmp_path / "small.txt").write_bytes(b"x" * 10)
+    (tmp_path / "Mid.txt").write_bytes(b"x" * 500)
+    (tmp_path / ".hidden").write_text("")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "inner.txt").write_text("")
+    for age, name in enumerate(["small.txt", "big.txt", "Mid.txt", "sub"]):
+        os.utime(tmp_path / name, (1e9 - age * 1000, 1e9 - age * 1000))
+    yield tmp_path
+    commands.set_terminal_columns(None)
+
+
+def ls(cwd, args=""):
+    _, (out_type, out) = run_command(str(cwd), f"ls {args}".strip())
+    return out_type, out if isinstance(out, str) else list(out)
+
+
+def test_default_hides_dotfiles_and_sorts_by_name(tree):
+    assert ls(tree) == ("dirlist", ["big.txt    Mid.txt    small.txt  sub"])
+    assert ls(tree, "-1a") == ("dirlist", [".hidden", "big.txt", "Mid.txt", "small.txt", "sub"])
+
+
+def test_sort_by_size_time_and_reverse(tree):
+    # A directory's own size depends on the filesystem, so leave it out.
+    files = [name for name in ls(tree, "-1S")[1] if name != "sub"]
+    assert files == ["big.txt", "Mid.txt", "small.txt"]
+    files = [name for name in ls(tree, "-1Sr")[1] if name != "sub"]
+    assert files == ["small.txt", "Mid.txt", "big.txt"]
+    assert ls(tree, "-1t")[1] == ["small.txt", "big.txt", "Mid.txt", "sub"]
+
+
+def test_long_format(tree):
+    _, lines = ls(tree, "-l")
+    assert len(lines) == 4
+    mode, size, *_, name = lines[0].split()
+    assert mode.startswith("-rw")
+    assert (size, name) == ("100000", "big.txt")
+    assert lines[3].startswith("d")
+    assert ls(tree, "-lh")[1][0].split()[1] == "98K"
+    assert ls(tree, "-l big.txt")[1][0].endswith(" big.txt")
+
+
+def test_recursive_and_unsorted(tree):
+    _, lines = ls(tree, "-1R")
+    assert lines == [".:", "big.txt", "Mid.txt", "small.txt", "sub", "", "./sub:", "inner.txt"]
+    assert sorted(ls(tree, "-U")[1]) == sorted(["big.txt", "Mid.txt", "small.txt", "sub"])
+
+
+def test_several_paths(tree):
+    _, lines = ls(tree, "sub missing small.txt .")
+    assert lines == [
+        "ls: cannot access 'missing': No such file or directory",
+        "small.txt",
+        "",
+        "sub:",
+        "inner.txt",
+        "",
+        ".:",
+        "big.txt    Mid.txt    small.txt  sub",
+    ]
+
+
+def test_errors(tree):
+    assert ls(tree, "missing") == ("error", "ls: cannot access 'missing': No such file or directory")
+    assert ls(tree, "-z")[0] == "error"
@@ -0,0 +1,35 @@
+import socket
+
+import netprobe
+from commands import run_command
+
+
+def test_probe_local_listeners():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    open_port = listener.getsockname()[1]
+    spare = socket.socket()
+    spare.bind(("127.0.0.1", 0))
+    closed_port = spare.getsockname()[1]
+    spare.close()
+    try:
+        cmd = (f"probe -c 2 -t 2 127.0.0.1:{open_port} 127.0.0.1:{closed_port} "
+               "127.0.0.1:70000")
+        cwd, (out_type, out_text) = run_command(".", cmd)
+        assert out_type == "__stream__"
+        lines = list(out_text)
+    finally:
+        listener.close()
+
+    by_target = {line.split()[0]: line for line in lines[:-1]}
+    assert " open " in by_target[f"127.0.0.1:{open_port}"]
+    assert "2/2" in by_target[f"127.0.0.1:{open_port}"]
+    assert " closed " in by_target[f"127.0.0.1:{closed_port}"]
+    assert "invalid target" in by_target["127.0.0.1:70000"]
+    assert lines[-1].startswith("--- 1/3 reachable, min/avg/p95 = ")
+
+
+def test_latency_stats():
+    assert netprobe.latency_stats([]) is None
+    assert netprobe.latency_stats(list(range(1, 101))) == (1, 50.5, 95)
@@ -0,0 +1,76 @@
+import getpass
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import proctable
+from commands import run_command
+from proctable import ProcessTable
+
+MARKER = f"winux-proctable-{os.getpid()}"
+
+
+@pytest.fixture
+def sleeper():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; print(flush=True); time.sleep(30)", MARKER],
+                            stdout=subprocess.PIPE)
+    proc.stdout.readline()
+    proctable.get_table().invalidate()
+    yield proc
+    proc.kill()
+    proc.wait()
+    proc.stdout.close()
+
+
+def test_proc_snapshot_lists_this_process():
+    if not os.path.isdir("/proc/self"):
+        pytest.skip("needs /proc")
+    table = ProcessTable()
+    table.psutil = None
+    procs = {p["pid"]: p for p in table.snapshot(("pid", "name", "cmdline", "username", "rss"))}
+    me = procs[os.getpid()]
+    assert me["name"]
+    assert "pytest" in me["cmdline"] or "python" in me["cmdline"]
+    assert me["username"] == getpass.getuser()
+    assert me["rss"] > 0
+
+
+def test_snapshot_reused_for_subset_within_ttl():
+    table = ProcessTable(ttl=60)
+    wide = table.snapshot(("pid", "name", "rss"))
+    assert table.snapshot(("name",)) is wide
+    assert table.snapshot(("pid", "cmdline")) is not wide
+    table.ttl = 0
+    assert table.snapshot(("name",)) is not wide
+
+
+def test_ps_filters_by_user_and_sorts():
+    _, (out_type, text) = run_command("/", f"ps -u {getpass.getuser()} --sort -rss")
+    assert out_type == "normal"
+    rows = text.split("\n")[1:]
+    assert str(os.getpid()) in [row.split()[0] for row in rows]
+    assert all(row.split()[1] == getpass.getuser()[:12] for row in rows)
+    pids = [int(row.split()[0]) for row in run_command("/", "ps --sort pid")[1][1].split("\n")[1:]]
+    assert pids == sorted(pids)
+    assert run_command("/", "ps --sort bogus")[1][0] == "error"
+
+
+def test_pgrep_full_with_names(sleeper):
+    _, (out_type, text) = run_command("/", f"pgrep -f -l {MARKER}")
+    assert out_type == "normal"
+    pid, name = text.split(" ", 1)
+    assert int(pid) == sleeper.pid
+    assert name.strip()
+    assert run_command("/", f"pgrep {MARKER}")[1] == ("normal", "No matching processes.")
+
+
+def test_pkill_matches_command_line(sleeper):
+    _, (_, text) = run_command("/", f"pkill -f {MARKER}")
+    assert text == f"Process {sleeper.pid} terminated."
+    deadline = time.time() + 5
+    while sleeper.poll() is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert sleeper.returncode is not None
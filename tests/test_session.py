@@ -0,0 +1,77 @@
+import os
+
+import session
+from session import SessionStore
+
+
+def lines(prefix, n):
+    return [("normal", f"{prefix} {i}") for i in range(n)]
+
+
+def test_clear_drops_older_chunks(tmp_path):
+    path = str(tmp_path / "session.wxs")
+    SessionStore(path).save(lines("old", 20000), {})
+
+    store = SessionStore(path)
+    history = store.load(tail_lines=100)
+    assert store.has_older()
+    store.clear()
+    assert not store.has_older()
+    assert store.load_older() == []
+
+    history = lines("new", 3)
+    store.save(history, {})
+    assert SessionStore(path).load(tail_lines=100) == history
+
+
+def test_state_is_rewritten_not_appended(tmp_path):
+    path = str(tmp_path / "session.wxs")
+    store = SessionStore(path)
+    history = lines("x", 10)
+    for i in range(200):
+        store.save(history, {"cwd": "/tmp", "commands": [f"cmd {n}" for n in range(i)]})
+    size = (tmp_path / "session.wxs").stat().st_size
+
+    restored = SessionStore(path)
+    assert restored.load(tail_lines=100) == history
+    assert restored.state["commands"][-1] == "cmd 198"
+    # Only the scrollback lives in the binary file.
+    assert size < 1024
+
+
+def test_trimmed_lines_stay_in_the_file(tmp_path):
+    path = str(tmp_path / "session.wxs")
+    store = SessionStore(path)
+    history = lines("a", 100)
+    store.save(history, {})
+    del history[:60]
+    store.trim(60)
+    history += lines("b", 5)
+    store.save(history, {})
+    assert SessionStore(path).load(tail_lines=1000) == lines("a", 100) + lines("b", 5)
+
+
+def test_reopen_hints_are_not_restored(tmp_path):
+    path = str(tmp_path / "session.wxs")
+    hint = "... 5000 earlier lines kept on disk (reopen 3 to page, save-output 3 <file> to save)"
+    SessionStore(path).save([("normal", "cat big"), ("warning", hint), ("normal", "last")], {})
+    assert SessionStore(path).load(tail_lines=10) == [
+        ("normal", "cat big"), ("warning", "... 5000 earlier lines were not saved"), ("normal", "last")]
+
+
+def test_file_is_capped_without_clear(tmp_path, monkeypatch):
+    monkeypatch.setattr(session, "MAX_BYTES", 64 * 1024)
+    monkeypatch.setattr(session, "RETAIN_LINES", 3000)
+    path = str(tmp_path / "session.wxs")
+    for launch in range(20):
+        store = SessionStore(path)
+        history = store.load(tail_lines=100)
+        history += [("normal", f"{launch} {i} " + os.urandom(16).hex()) for i in range(1000)]
+        store.save(history, {})
+    assert os.path.getsize(path) < 2 * 64 * 1024
+    store = SessionStore(path)
+    history = store.load(tail_lines=100)
+    while store.has_older():
+        history[0:0] = store.load_older()
+    assert 1000 <= len(history) <= 4000
+    assert history[-1][1].startswith("19 999 ")
@@ -0,0 +1,52 @@
+import os
+import time
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+import startup
+from startup import StartupProfile, load_font
+
+DEFAULT_FONT = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+
+
+@pytest.fixture
+def lookups(tmp_path, monkeypatch):
+    pygame.font.init()
+    monkeypatch.setattr(startup, "config_path", lambda name: str(tmp_path / name))
+    calls = []
+    found = {}
+    monkeypatch.setattr(pygame.font, "match_font", lambda name: calls.append(name) or found.get(name))
+    return calls, found
+
+
+def test_font_path_is_cached(lookups):
+    calls, found = lookups
+    found["Consolas"] = DEFAULT_FONT
+    assert load_font("Consolas", 16).get_height() > 0
+    assert load_font("Consolas", 16).get_height() > 0
+    assert calls == ["Consolas"]
+
+
+def test_missing_font_is_cached_too(lookups):
+    calls, _ = lookups
+    assert load_font("Consolas", 16).get_height() > 0
+    assert load_font("Consolas", 16).get_height() > 0
+    assert calls == ["Consolas"]
+
+
+def test_profile_counts_time_before_it_was_created():
+    profile = StartupProfile(True, time.perf_counter() - 0.5)
+    profile.mark("imports")
+    profile.mark("window")
+    (_, imports), (_, window) = profile.phases
+    assert imports >= 0.5 > window
+    assert profile.report()[1].split()[0] == "imports"
+    assert profile.report()[-1].split()[0] == "total"
+
+
+def test_disabled_profile_records_nothing():
+    profile = StartupProfile(False)
+    profile.mark("imports")
+    assert profile.phases == []
@@ -0,0 +1,38 @@
+import time
+
+from commands import run_command
+from watch import Watcher
+
+
+def wait_for(watcher, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = watcher.poll()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError("watcher produced nothing")
+
+
+def test_failing_command_is_reported_and_retried():
+    calls = []
+
+    def run(cwd, command, record_history=True):
+        calls.append(command)
+        if len(calls) == 1:
+            raise OSError("disk on fire")
+        return cwd, ("normal", "fine")
+
+    watcher = Watcher(run, "/", "flaky", 0.05)
+    try:
+        assert wait_for(watcher) == ("error", ["watch: flaky: disk on fire"], set())
+        assert wait_for(watcher)[:2] == ("normal", ["fine"])
+    finally:
+        watcher.stop()
+
+
+def test_watch_n_without_value_is_rejected(tmp_path):
+    usage = ("error", "Usage: watch [-n secs] <command>")
+    assert run_command(str(tmp_path), "watch -n")[1] == usage
+    assert run_command(str(tmp_path), "watch -n 2")[1] == usage
+    assert run_command(str(tmp_path), "watch -n 2 pwd")[1] == ("__watch__", "2.0 pwd")